@@ -0,0 +1,144 @@
+import os
+import random
+import subprocess
+import sys
+import timeit
+
+import tktitler as tk
+
+
+def _corpus(n, seed=0):
+    rng = random.Random(seed)
+    roots = ['CERM', 'FORM', 'INKA', 'KASS', 'NF', 'PR', 'SEKR', 'VC',
+             'BEST', 'FU', 'BESTFU', 'FUHØ', 'FUÅÆ', 'FUUE']
+    ascii_aliases = []
+    unicode_aliases = []
+    for _ in range(n):
+        title = (rng.choice(roots), rng.randrange(1990, 2030))
+        ascii_aliases.append(rng.choice([
+            tk.prefix(title, 2016),
+            tk.postfix(title, type=rng.choice(['single', 'double', 'slash',
+                                               'longslash'])),
+            tk.email(title, 2016),
+        ]))
+        unicode_aliases.append(rng.choice([
+            tk.prefix(title, 2016, type='unicode'),
+            tk.postfix(title),
+        ]))
+    noise = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz.-_+@£ℂ₂')
+                     for _ in range(rng.randrange(4, 20)))
+             for _ in range(n)]
+    mixed = ascii_aliases + unicode_aliases + noise
+    rng.shuffle(mixed)
+    return dict(ascii=ascii_aliases, unicode=unicode_aliases, noise=noise,
+                mixed=mixed)
+
+
+def bench_normalize(n=10000, repeat=5):
+    results = {}
+    for name, corpus in sorted(_corpus(n).items()):
+        t = min(timeit.repeat(lambda: [tk._normalize(s) for s in corpus],
+                              number=1, repeat=repeat))
+        results[name] = t / len(corpus)
+    return results
+
+
+def bench_render(n=2000, repeat=5):
+    rng = random.Random(0)
+    titles = [(rng.choice(['CERM', 'FORM', 'KASS', 'FUHØ']),
+               rng.randrange(1990, 2030)) for _ in range(n)]
+
+    def separate():
+        for title in titles:
+            tk.prefix(title, 2016)
+            tk.prefix(title, 2016, type='unicode')
+            tk.prefix(title, 2016, type='tex')
+            tk.postfix(title)
+            tk.prepostfix(title, 2016)
+            tk.email(title, 2016)
+
+    def combined():
+        for title in titles:
+            tk.render(title, 2016)
+
+    return {
+        'separate': min(timeit.repeat(separate, number=1, repeat=repeat)) / n,
+        'render': min(timeit.repeat(combined, number=1, repeat=repeat)) / n,
+    }
+
+
+def bench_is_title_alias(n=10000, repeat=5):
+    results = {}
+    for name, corpus in sorted(_corpus(n).items()):
+        t = min(timeit.repeat(
+            lambda: [tk.is_title_alias(s) for s in corpus],
+            number=1, repeat=repeat))
+        results[name] = t / len(corpus)
+    return results
+
+
+def bench_complete(n=50000, repeat=5):
+    rng = random.Random(0)
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZÆØÅ'
+    titles = [('FU' + rng.choice(letters) + rng.choice(letters),
+               rng.randrange(1960, 2017)) for _ in range(n)]
+    index = tk.completion_index(titles, 2016)
+    queries = ['', 'F', 'GFU', 'FUH', 'FUAB9', 'TOF']
+    t = min(timeit.repeat(lambda: [index.complete(q) for q in queries],
+                          number=100, repeat=repeat))
+    return t / (100 * len(queries))
+
+
+# Budget for the cumulative import time of tktitler reported by
+# python -X importtime, in seconds.
+IMPORT_BUDGET = 0.020
+
+
+def bench_import(repeat=5):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPATH'] = os.path.dirname(os.path.abspath(tk.__file__))
+    times = []
+    for _ in range(repeat + 1):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import tktitler'],
+            env=env, stderr=subprocess.PIPE, universal_newlines=True,
+            check=True).stderr
+        for line in output.splitlines():
+            fields = line.split('|')
+            if fields[-1].strip() == 'tktitler':
+                times.append(int(fields[1]) / 1e6)
+    # The first run may have to write the byte-code cache.
+    return min(times[1:])
+
+
+def bench_first_call(repeat=5):
+    code = ('import time; import tktitler; t = time.perf_counter(); '
+            'tktitler.parse("T2OKA$$ 2012/13"); '
+            'print(time.perf_counter() - t)')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.abspath(tk.__file__))
+    return min(float(subprocess.run(
+        [sys.executable, '-c', code], env=env, stdout=subprocess.PIPE,
+        universal_newlines=True, check=True).stdout)
+        for _ in range(repeat))
+
+
+def main():
+    for name, t in sorted(bench_normalize().items()):
+        print('_normalize %-8s %8.0f ns/call' % (name, t * 1e9))
+    for name, t in sorted(bench_render().items()):
+        print('render     %-8s %8.0f ns/title' % (name, t * 1e9))
+    for name, t in sorted(bench_is_title_alias().items()):
+        print('is_title_alias %-8s %8.0f ns/call' % (name, t * 1e9))
+    print('complete   %8.0f ns/call' % (bench_complete() * 1e9))
+    print('first parse    %8.2f ms' % (bench_first_call() * 1e3))
+    t = bench_import()
+    print('import         %8.2f ms (budget %.2f ms)' %
+          (t * 1e3, IMPORT_BUDGET * 1e3))
+    if t > IMPORT_BUDGET:
+        sys.exit('import tktitler is over budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,13 @@
+import os
+import sys
+import random
+import sqlite3
+import subprocess
+import asyncio
+import tempfile
+import threading
 import unittest
+import unittest.mock
 from testfixtures import log_capture
 import tktitler as tk
 
@@ -827,5 +836,1620 @@ class TestValidateTitle(unittest.TestCase):
             tk.validate_title(("CERM", 11))
 
 
+class TestRootRegistry(unittest.TestCase):
+    def test_parse_known_root_shared(self):
+        root, period = tk.parse('FORM11')
+        self.assertIs(root, tk.parse('GFORM', 2012)[0])
+
+    def test_parse_unknown_root_shared(self):
+        a, _ = tk.parse('FUHOE11')
+        b, _ = tk.parse('GFUHOE', 2012)
+        self.assertIs(a, b)
+
+    def test_validate_title_interned(self):
+        root = ''.join(['FO', 'RM'])
+        self.assertIs(tk.validate_title((root, 2011))[0],
+                      tk.parse('FORM11')[0])
+
+    def test_validate_title_tuple(self):
+        for root in ('KASS', ''.join(['KA', 'SS']), 'ABEN'):
+            self.assertEqual(type(tk.validate_title([root, 2011])), tuple)
+            self.assertEqual(type(tk.try_validate([root, 2011])[0]), tuple)
+        title = ('ABEN', 2011)
+        self.assertIs(tk.validate_title(title), title)
+
+    def test_preseeded(self):
+        for root in ('CERM', 'FORM', 'INKA', 'KASS', 'BESTFU'):
+            self.assertIn(root, tk.root_registry)
+
+    def test_bounded(self):
+        registry = tk._RootRegistry(['FORM'], maxsize=2)
+        registry.intern('CERM')
+        registry.intern('INKA')
+        self.assertEqual(len(registry), 2)
+        self.assertNotIn('INKA', registry)
+
+    def test_admit(self):
+        registry = tk._RootRegistry(admit=lambda root: root.startswith('F'))
+        registry.intern('FORM')
+        registry.intern('CERM')
+        self.assertIn('FORM', registry)
+        self.assertNotIn('CERM', registry)
+
+    def test_rejected_remembered(self):
+        calls = []
+
+        def admit(root):
+            calls.append(root)
+            return root.startswith('F')
+
+        registry = tk._RootRegistry(admit=admit)
+        for _ in range(3):
+            registry.intern('CERM')
+        self.assertEqual(calls, ['CERM'])
+        registry.clear_rejected()
+        registry.intern('CERM')
+        self.assertEqual(calls, ['CERM', 'CERM'])
+
+    def test_known_after_rejected(self):
+        tk.validate_title(('KOKO', 2011))
+        tk.add_known_root('KOKO')
+        try:
+            self.assertIn('KOKO', tk.root_registry)
+            self.assertIs(tk.validate_title((''.join(['KO', 'KO']), 2011))[0],
+                          tk.parse('KOKO11')[0])
+        finally:
+            tk.remove_known_root('KOKO')
+
+    def test_fu_newline(self):
+        self.assertFalse(tk._is_known_root('FUAB\n'))
+
+    def test_noise_not_registered(self):
+        size = len(tk.root_registry)
+        for alias in tk.generate_corpus(2000, seed=5, mix={'noise': 1},
+                                        gfyear=2016):
+            try:
+                root, period = tk.parse(alias, 2016)
+            except ValueError:
+                continue
+            if root not in tk.known_roots() and not root.startswith('FU'):
+                self.assertNotIn(root, tk.root_registry)
+        self.assertLess(len(tk.root_registry), size + 100)
+        a, _ = tk.parse('FUHOE11')
+        b, _ = tk.parse('GFUHOE', 2012)
+        self.assertIs(a, b)
+
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        tk.build_index(self.path, ['FORM', 'KASS', 'FUHØ'],
+                       range(2005, 2020), gfyear=2016)
+        self.index = tk.open_index(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        os.remove(self.path)
+
+    def test_prefix(self):
+        self.assertEqual(self.index['T2OKA$$'], ('KASS', 2011))
+
+    def test_prefix_unicode(self):
+        self.assertEqual(self.index['T³OFORM'], ('FORM', 2010))
+
+    def test_postfix(self):
+        self.assertEqual(self.index['FUHØ 2011/12'], ('FUHØ', 2011))
+
+    def test_prepostfix(self):
+        self.assertEqual(self.index['OFORM 2013/14'], ('FORM', 2013))
+
+    def test_email(self):
+        self.assertEqual(self.index['FUHOE11'], ('FUHØ', 2011))
+        self.assertEqual(self.index['T2OFUHOE'], ('FUHØ', 2011))
+
+    def test_unknown(self):
+        self.assertIsNone(self.index.get('CERM11'))
+        with self.assertRaises(KeyError):
+            self.index['CERM11']
+
+    def test_matches_parse(self):
+        for alias in ('GFORM', 'KA$$ 2012/13', 'FUHØ1112'):
+            self.assertEqual(self.index[alias], tk.parse(alias, 2016))
+
+    def test_types(self):
+        tk.build_index(self.path, ['FORM'], [2011], types=['postfix'],
+                       gfyear=2016)
+        with tk.open_index(self.path) as index:
+            self.assertEqual(len(index), 4)
+            self.assertNotIn('T2OFORM', index)
+
+    def test_invalid_type(self):
+        with self.assertRaisesRegex(
+                ValueError, "'kprefix' is not a valid type-parameter"):
+            tk.build_index(self.path, ['FORM'], [2011], types=['kprefix'],
+                           gfyear=2016)
+
+    def test_not_an_index(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'\0' * 32)
+        with self.assertRaisesRegex(ValueError, "is not a title index"):
+            tk.open_index(self.path)
+
+
+class TestAliases(unittest.TestCase):
+    def rendered(self, title, gfyear):
+        result = set()
+        for t in ('normal', 'unicode', 'tex'):
+            result.add(tk.prefix(title, gfyear, type=t))
+            result.add(tk.kprefix(title, gfyear, type=t))
+            for u in ('single', 'double', 'slash', 'longslash'):
+                result.add(tk.prepostfix(title, gfyear, prefixtype=t,
+                                         postfixtype=u))
+        for u in ('single', 'double', 'slash', 'longslash'):
+            result.add(tk.postfix(title, type=u))
+        for t in ('postfix', 'prefix'):
+            result.add(tk.email(title, gfyear, type=t))
+        return result
+
+    def test_covers_renderers(self):
+        for title in [('KASS', 2010), ('FUHØ', 2015), ('CERM', 2018),
+                      ('FUÆU', 2021), ('FORM', 2016)]:
+            aliases = set(tk.aliases(title, 2016))
+            self.assertLessEqual(self.rendered(title, 2016), aliases)
+
+    def test_unique(self):
+        aliases = list(tk.aliases(('FUÅÆ', 2012), 2016))
+        self.assertEqual(len(aliases), len(set(aliases)))
+
+    def test_escaped(self):
+        aliases = set(tk.aliases(('FUÅÆ', 2012), 2016))
+        self.assertIn('TOFUAAAE', aliases)
+        self.assertIn('FUAAAE 2012/13', aliases)
+
+    def test_funny(self):
+        aliases = set(tk.aliases(('KASS', 2015), 2016))
+        self.assertIn('GKASS', aliases)
+        self.assertIn('GKA$$', aliases)
+
+    def test_efuit(self):
+        aliases = set(tk.aliases(('EFUIT', 2010), 2016))
+        self.assertIn('T3OEFUIT', aliases)
+        self.assertNotIn('T3OEFUIT 2010/11', aliases)
+
+    def test_context(self):
+        with tk.set_gfyear(2016):
+            self.assertIn('GFORM', tk.aliases(('FORM', 2015)))
+
+
+class TestMailmap(unittest.TestCase):
+    roster = [(('FORM', 2015), 'form@example.com'),
+              (('FUHØ', 2012), 'fuhoe@example.com')]
+
+    def test_aliases(self):
+        m = tk.mailmap(self.roster, 2016)
+        self.assertEqual(m.aliases, {
+            'FORM15': 'form@example.com',
+            'GFORM': 'form@example.com',
+            'FUHOE12': 'fuhoe@example.com',
+            'TOFUHOE': 'fuhoe@example.com',
+        })
+        self.assertEqual(m.changed, m.aliases)
+        self.assertEqual(m.removed, set())
+
+    def test_matches_email(self):
+        m = tk.mailmap(self.roster, 2016)
+        for title, destination in self.roster:
+            for t in ('postfix', 'prefix'):
+                self.assertEqual(m.aliases[tk.email(title, 2016, type=t)],
+                                 destination)
+
+    def test_unchanged(self):
+        m = tk.mailmap(self.roster, 2016)
+        m = tk.mailmap(self.roster, 2016, previous=m)
+        self.assertEqual(m.changed, {})
+        self.assertEqual(m.removed, set())
+
+    def test_rollover(self):
+        m = tk.mailmap(self.roster, 2016)
+        m = tk.mailmap(self.roster, 2017, previous=m)
+        self.assertEqual(m.changed, {'BFORM': 'form@example.com',
+                                     'T2OFUHOE': 'fuhoe@example.com'})
+        self.assertEqual(m.removed, {'GFORM', 'TOFUHOE'})
+
+    def test_roster_change(self):
+        m = tk.mailmap(self.roster, 2016)
+        roster = self.roster[:1] + [(('CERM', 2016), 'cerm@example.com')]
+        m = tk.mailmap(roster, 2016, previous=m)
+        self.assertEqual(m.changed, {'CERM16': 'cerm@example.com',
+                                     'CERM': 'cerm@example.com'})
+        self.assertEqual(m.removed, {'FUHOE12', 'TOFUHOE'})
+
+    def test_shared_alias(self):
+        m = tk.mailmap([(('FORM', 2015), 'a'), (('FORM', 2015), 'b')], 2016)
+        self.assertEqual(m.aliases['FORM15'], 'a, b')
+
+    def test_shared_alias_order(self):
+        roster = [(('FORM', 2015), 'b'), (('FORM', 2015), 'a'),
+                  (('KASS', 2015), 'c')]
+        m = tk.mailmap(roster, 2016)
+        self.assertEqual(m.aliases['FORM15'], 'a, b')
+        m = tk.mailmap(roster[::-1], 2016, previous=m)
+        self.assertEqual(m.changed, {})
+        self.assertEqual(m.removed, set())
+
+    def test_shared_alias_duplicate(self):
+        m = tk.mailmap([(('FORM', 2015), 'a'), (('FORM', 2015), 'a')], 2016)
+        self.assertEqual(m.aliases['FORM15'], 'a')
+
+    def test_context(self):
+        with tk.set_gfyear(2016):
+            self.assertIn('GFORM', tk.mailmap(self.roster).aliases)
+
+
+class TestNormalize(unittest.TestCase):
+    def test_ascii(self):
+        self.assertEqual(tk._normalize('ka$$ 2012/13'), 'KASS2012/13')
+
+    def test_bestfu(self):
+        self.assertEqual(tk._normalize('best/fu'), 'BESTFU')
+
+    def test_superscript(self):
+        self.assertEqual(tk._normalize('T¹²OFORM'), 'T12OFORM')
+
+    def test_subscript(self):
+        self.assertEqual(tk._normalize('T₃OFORM'), 'T3OFORM')
+
+    def test_fullwidth_digit(self):
+        self.assertEqual(tk._normalize('T\uff13OFORM'), 'T3OFORM')
+
+    def test_symbols(self):
+        self.assertEqual(tk._normalize('\N{DOUBLE-STRUCK CAPITAL C}ERM'),
+                         'CERM')
+        self.assertEqual(tk._normalize('KA££'), 'KASS')
+
+    def test_danish(self):
+        self.assertEqual(tk._normalize('fuhø'), 'FUHØ')
+
+    def test_other_unchanged(self):
+        self.assertEqual(tk._normalize('FUÉ-X'), 'FUÉ-X')
+
+
+class TestParseDetailed(unittest.TestCase):
+    def test_spans(self):
+        r = tk.parse_detailed('T2OKA$$ 2012/13')
+        self.assertEqual(r.alias, 'T2OKASS2012/13')
+        self.assertEqual(r.alias[slice(*r.prefix_span)], 'T2O')
+        self.assertEqual(r.alias[slice(*r.root_span)], 'KASS')
+        self.assertEqual(r.alias[slice(*r.postfix_span)], '2012/13')
+
+    def test_relative(self):
+        r = tk.parse_detailed('BFORM', 2016)
+        self.assertEqual(r.age, 2)
+        self.assertIsNone(r.postfix_year)
+        self.assertEqual(r.postfix_span, (5, 5))
+        self.assertEqual(r.title, ('FORM', 2014))
+
+    def test_unescape(self):
+        r = tk.parse_detailed('FUHOE11')
+        self.assertTrue(r.unescaped)
+        self.assertFalse(r.special_case)
+        self.assertEqual(r.title, ('FUHØ', 2011))
+
+    def test_special_case(self):
+        r = tk.parse_detailed('FUAEU', 2021)
+        self.assertTrue(r.unescaped)
+        self.assertTrue(r.special_case)
+        self.assertEqual(r.title, ('FUÄU', 2021))
+
+    def test_matches_parse(self):
+        for alias in ('FUAN', 'KUNDESERVICE', 'T³OCERM', 'G3OKFORM13',
+                      'BBEST/FU', 'FUAEU'):
+            self.assertEqual(tk.parse_detailed(alias, 2021).title,
+                             tk.parse(alias, 2021))
+
+    def test_ambiguous(self):
+        with self.assertRaisesRegex(ValueError, "FUAAA is an ambiguous"):
+            tk.parse_detailed('FUAAA11')
+
+
+class TestRelativeTitle(unittest.TestCase):
+    def test_attributes(self):
+        r = tk.parse_relative('OT2OFORM16')
+        self.assertEqual((r.root, r.age, r.postfix_year, r.needs_unescape),
+                         ('FORM', 8, 2016, False))
+
+    def test_resolve(self):
+        r = tk.parse_relative('BFORM')
+        self.assertEqual(r.resolve(2016), ('FORM', 2014))
+        self.assertEqual(r.resolve(2020), ('FORM', 2018))
+        with tk.set_gfyear(2017):
+            self.assertEqual(r.resolve(), ('FORM', 2015))
+
+    def test_resolve_postfix(self):
+        r = tk.parse_relative('GFORM11')
+        self.assertEqual(r.resolve(2016), ('FORM', 2010))
+        self.assertEqual(r.resolve(2030), ('FORM', 2010))
+
+    def test_special_case(self):
+        r = tk.parse_relative('FUAEU')
+        self.assertEqual(r.root, 'FUAEU')
+        self.assertEqual(r.resolve(2020), ('FUÆU', 2020))
+        self.assertEqual(r.resolve(2021), ('FUÄU', 2021))
+
+    def test_ambiguous(self):
+        r = tk.parse_relative('FUAAA')
+        with self.assertRaisesRegex(ValueError, "FUAAA is an ambiguous"):
+            r.resolve(2016)
+
+    def test_gfyear_unset(self):
+        with self.assertRaises(ValueError):
+            tk.parse_relative('GFORM').resolve()
+
+    def test_matches_parse(self):
+        for alias in ('FUAN', 'KUNDESERVICE', 'T³OCERM', 'G3OKFORM13',
+                      'BBEST/FU', 'FUAEU', 'KA$$ 2012/13'):
+            for gfyear in (2016, 2021):
+                self.assertEqual(tk.parse_relative(alias).resolve(gfyear),
+                                 tk.parse(alias, gfyear))
+
+    def test_equal(self):
+        self.assertEqual(tk.parse_relative('gform'),
+                         tk.parse_relative('GFORM'))
+        self.assertNotEqual(tk.parse_relative('GFORM'),
+                            tk.parse_relative('BFORM'))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            tk.parse_detailed('FORM11').foo = 1
+
+
+class TestRender(unittest.TestCase):
+    titles = [('KASS', 2011), ('FUHØ', 2010), ('CERM', 2018), ('FORM', 2016),
+              ('FUÆU', 2021), ('', 2012)]
+
+    def test_default(self):
+        for title in self.titles:
+            self.assertEqual(tk.render(title, 2016), {
+                'prefix': tk.prefix(title, 2016),
+                'prefix:unicode': tk.prefix(title, 2016, type='unicode'),
+                'prefix:tex': tk.prefix(title, 2016, type='tex'),
+                'postfix': tk.postfix(title),
+                'prepostfix': tk.prepostfix(title, 2016),
+                'email': tk.email(title, 2016),
+            })
+
+    def test_types(self):
+        for title in self.titles:
+            r = tk.render(title, 2016, ['kprefix:unicode', 'postfix:double',
+                                        'prepostfix:tex:slash',
+                                        'email:prefix'])
+            self.assertEqual(r['kprefix:unicode'],
+                             tk.kprefix(title, 2016, type='unicode'))
+            self.assertEqual(r['postfix:double'],
+                             tk.postfix(title, type='double'))
+            self.assertEqual(r['prepostfix:tex:slash'],
+                             tk.prepostfix(title, 2016, prefixtype='tex',
+                                           postfixtype='slash'))
+            self.assertEqual(r['email:prefix'],
+                             tk.email(title, 2016, type='prefix'))
+
+    def test_efuit(self):
+        r = tk.render(('EFUIT', 2010), 2016, ['prepostfix'])
+        self.assertEqual(r['prepostfix'], 'T3OEFUIT')
+
+    @log_capture()
+    def test_efuit_postfix_warning(self, l):
+        tk.render(('EFUIT', 2010), 2016, ['postfix'])
+        l.check(('tktitler', 'WARNING',
+                 'Returning an EFUIT postfix. The postfix does not '
+                 'necessarily represent the actual year the given EFUIT '
+                 'was EFUIT.'))
+
+    def test_invalid_format(self):
+        with self.assertRaisesRegex(ValueError,
+                                    "'suffix' is not a valid format"):
+            tk.render(('FORM', 2011), 2016, ['suffix'])
+
+    def test_invalid_type(self):
+        with self.assertRaisesRegex(
+                ValueError, "'foo' is not a valid type-parameter"):
+            tk.render(('FORM', 2011), 2016, ['postfix:foo'])
+
+
+class TestRegisterType(unittest.TestCase):
+    def tearDown(self):
+        tk._PREFIX_TYPES.pop('markdown', None)
+        tk._POSTFIX_TYPES.pop('roman', None)
+
+    def test_prefix_type(self):
+        tk.register_prefix_type('markdown', lambda n: '^%s^' % n,
+                                lambda s: s.replace('$', '\\$'))
+        self.assertEqual(tk.prefix(('KASS', 2010), 2016, type='markdown'),
+                         'T^3^OKA\\$\\$')
+        self.assertEqual(tk.kprefix(('FORM', 2018), 2016, type='markdown'),
+                         'K^2^FORM')
+        self.assertEqual(
+            tk.render(('FORM', 2010), 2016, ['prefix:markdown']),
+            {'prefix:markdown': 'T^3^OFORM'})
+
+    def test_postfix_type(self):
+        tk.register_postfix_type('roman', lambda period, space: space + 'MMXI')
+        self.assertEqual(tk.postfix(('FORM', 2011), type='roman'),
+                         'FORM MMXI')
+        self.assertEqual(
+            tk.prepostfix(('FORM', 2011), 2016, postfixtype='roman'),
+            'T2OFORM MMXI')
+
+    def test_unregister(self):
+        tk.register_prefix_type('markdown', lambda n: '^%s^' % n)
+        tk.register_postfix_type('roman', lambda period, space: 'MMXI')
+        tk.unregister_prefix_type('markdown')
+        tk.unregister_postfix_type('roman')
+        with self.assertRaisesRegex(
+                ValueError, "'roman' is not a valid type-parameter"):
+            tk.postfix(('FORM', 2011), type='roman')
+        with self.assertRaisesRegex(ValueError,
+                                    "'roman' is not a registered type"):
+            tk.unregister_postfix_type('roman')
+        with self.assertRaisesRegex(ValueError,
+                                    "'tex' is a built-in type"):
+            tk.unregister_prefix_type('tex')
+        with self.assertRaisesRegex(ValueError,
+                                    "'single' is a built-in type"):
+            tk.unregister_postfix_type('single')
+
+    def test_duplicate(self):
+        with self.assertRaisesRegex(ValueError,
+                                    "'tex' is already a registered type"):
+            tk.register_prefix_type('tex', str)
+        with self.assertRaisesRegex(ValueError,
+                                    "'single' is already a registered type"):
+            tk.register_postfix_type('single', str)
+
+
+class TestSpecialCases(unittest.TestCase):
+    def setUp(self):
+        self.emails = dict(tk._SPECIAL_EMAILS)
+        self.roots = dict(tk._SPECIAL_ROOTS)
+
+    def tearDown(self):
+        tk._SPECIAL_EMAILS.clear()
+        tk._SPECIAL_EMAILS.update(self.emails)
+        tk._SPECIAL_ROOTS.clear()
+        tk._SPECIAL_ROOTS.update(self.roots)
+        tk._SPECIAL_EMAIL_NAMES.clear()
+        tk._SPECIAL_EMAIL_NAMES.update(e for e, p in self.roots)
+        tk._SPECIAL_ROOT_NAMES.clear()
+        tk._SPECIAL_ROOT_NAMES.update(self.roots.values())
+
+    def test_add(self):
+        tk.add_special_case('FUÖH', 2030, 'FUOEH')
+        self.assertEqual(tk.email(('FUÖH', 2030), 2030), 'FUOEH30')
+        self.assertEqual(tk.parse('FUOEH30'), ('FUÖH', 2030))
+        self.assertEqual(tk.parse('FUOEH31'), ('FUØH', 2031))
+
+    def test_is_title_alias(self):
+        self.assertFalse(tk.is_title_alias('FUAAE30'))
+        tk.add_special_case('FUÅÄ', 2030, 'FUAAE')
+        self.assertTrue(tk.is_title_alias('FUAAE30'))
+
+    def test_same_twice(self):
+        tk.add_special_case('FUÄU', 2021, 'FUAEU')
+
+    def test_root_collision(self):
+        with self.assertRaisesRegex(ValueError,
+                                    "FUÄU 2021 already has the email FUAEU"):
+            tk.add_special_case('FUÄU', 2021, 'FUAEUU')
+
+    def test_email_collision(self):
+        with self.assertRaisesRegex(
+                ValueError, "FUAEU 2021 is already the email of FUÄU"):
+            tk.add_special_case('FUÆÜ', 2021, 'FUAEU')
+
+    def test_invalid(self):
+        with self.assertRaisesRegex(ValueError, "'21' is not a valid period"):
+            tk.add_special_case('FUÄU', 21, 'FUAEU')
+
+    def test_load(self):
+        fd, path = tempfile.mkstemp()
+        with open(fd, 'w', encoding='utf-8') as fp:
+            fp.write('[["FUÖH", 2030, "FUOEH"]]')
+        try:
+            tk.load_special_cases(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(tk.parse('GFUOEH', 2031), ('FUÖH', 2030))
+
+
+class TestKnownRoots(unittest.TestCase):
+    def tearDown(self):
+        tk._KNOWN_ROOTS.discard('KOKO')
+        tk._KNOWN_ROOTS.discard('X')
+        tk._alias_patterns = None
+
+    def test_builtin(self):
+        self.assertIn('CERM', tk.known_roots())
+        self.assertIn('BESTFU', tk.known_roots())
+
+    def test_add(self):
+        self.assertEqual(tk.parse('KOKO', 2016), ('', 2012))
+        tk.add_known_root('KOKO')
+        self.assertIn('KOKO', tk.known_roots())
+        self.assertEqual(tk.parse('KOKO', 2016), ('KOKO', 2016))
+        self.assertEqual(tk.parse('GKOKO', 2016), ('KOKO', 2015))
+        self.assertEqual(tk.parse('KOKO11', 2016), ('KOKO', 2011))
+
+    def test_rebuild_once(self):
+        tk.parse('FORM', 2016)
+        patterns = tk._get_alias_patterns()
+        tk.add_known_root('FORM')
+        self.assertIs(tk._get_alias_patterns(), patterns)
+        tk.add_known_root('KOKO')
+        self.assertIsNot(tk._get_alias_patterns(), patterns)
+
+    def test_one_letter(self):
+        self.assertFalse(tk.is_title_alias('X'))
+        tk.add_known_root('X')
+        self.assertTrue(tk.is_title_alias('X'))
+        self.assertTrue(tk.is_title_alias('x'))
+        self.assertFalse(tk.is_title_alias(''))
+
+    def test_remove(self):
+        tk.add_known_root('KOKO')
+        self.assertEqual(tk.parse('GKOKO', 2016), ('KOKO', 2015))
+        tk.remove_known_root('KOKO')
+        self.assertNotIn('KOKO', tk.known_roots())
+        self.assertEqual(tk.parse('KOKO', 2016), ('', 2012))
+        with self.assertRaisesRegex(ValueError, "is not a known root"):
+            tk.remove_known_root('KOKO')
+        with self.assertRaisesRegex(ValueError, "is a built-in root"):
+            tk.remove_known_root('FORM')
+
+    def test_invalid(self):
+        for root in ('koko', 'KO2', '', 7, 'KOKO\n'):
+            with self.assertRaisesRegex(ValueError, "is not a valid root"):
+                tk.add_known_root(root)
+
+    def test_trie_pattern(self):
+        self.assertEqual(tk._trie_pattern(['BEST', 'BESTFU', 'FU', 'FORM']),
+                         '(?:BEST(?:FU)?|F(?:ORM|U))')
+
+
+class TestIsTitleAlias(unittest.TestCase):
+    def test_titles(self):
+        for alias in ('FORM', 'T2OKA$$', 'KA$$ 2012/13', 'GFUOEP17',
+                      'T³OCERM', 'BEST/FU16', 'fuhø', 'FUAEU', 'EFUIT'):
+            self.assertTrue(tk.is_title_alias(alias), alias)
+
+    def test_not_titles(self):
+        for alias in ('john.doe@example.com', 'MAILER-DAEMON', '', 'F',
+                      'FORM11/13', 'FUAAA11', 'FUAAE', 'UNDESERVICE', 17):
+            self.assertFalse(tk.is_title_alias(alias), alias)
+
+    def test_trailing_newline(self):
+        for alias in ('FORM\n', 'GFORM\n', 'FORM11\n', 'FORM \n',
+                      'KA$$ 2012/13\n'):
+            self.assertEqual(tk.parse(alias, 2016)[0],
+                             'KASS' if 'KA' in alias else 'FORM')
+            self.assertTrue(tk.is_title_alias(alias), repr(alias))
+        self.assertFalse(tk.is_title_alias('FORM\n\n'))
+        self.assertFalse(tk.is_title_alias('FORM\nX'))
+
+    def test_newlines_not_strict(self):
+        self.assertEqual(tk.parse('FORM\n\n', 2016), ('FORM\n', 2016))
+        self.assertTrue(tk.is_title_alias('FORM\n\n', strict=False))
+        self.assertEqual(tk.try_parse('A\nB', 2016), (('A\nB', 2016), None))
+
+    def test_unknown_root(self):
+        self.assertFalse(tk.is_title_alias('T2OABEN'))
+        self.assertTrue(tk.is_title_alias('T2OABEN', strict=False))
+
+    def test_not_strict(self):
+        self.assertTrue(tk.is_title_alias('john.doe', strict=False))
+        self.assertFalse(tk.is_title_alias('FORM1113', strict=False))
+        self.assertFalse(tk.is_title_alias('FUAAA11', strict=False))
+
+    @log_capture()
+    def test_2021(self, l):
+        self.assertTrue(tk.is_title_alias('FORM2021'))
+        l.check()
+
+    def test_no_false_negatives(self):
+        for title in [('KASS', 2011), ('FUHØ', 2010), ('FUÅÆ', 2018),
+                      ('BESTFU', 2016), ('FUÆU', 2021), ('EFUIT', 1990)]:
+            for alias in tk.aliases(title, 2016):
+                try:
+                    tk.parse(alias, 2016)
+                except ValueError:
+                    continue
+                self.assertTrue(tk.is_title_alias(alias, strict=False),
+                                alias)
+                if '{' not in alias:
+                    # TeX prefixes are not parsed as prefixes
+                    self.assertTrue(tk.is_title_alias(alias), alias)
+
+
+class TestTry(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(tk.try_parse('KA$$ 2012/13'), (('KASS', 2012), None))
+        self.assertEqual(tk.try_parse('T2OFORM', 2016),
+                         (('FORM', 2011), None))
+
+    def test_parse_special_case(self):
+        self.assertEqual(tk.try_parse('FUAEU', 2021), (('FUÄU', 2021), None))
+
+    def test_parse_errors(self):
+        self.assertEqual(tk.try_parse(None), (None, 'alias-type'))
+        self.assertEqual(tk.try_parse('FORM11/13'), (None, 'postfix'))
+        self.assertEqual(tk.try_parse('FORM1/2/3'), (None, 'postfix'))
+        self.assertEqual(tk.try_parse('FUAAE11'), (None, 'ambiguous'))
+        self.assertEqual(tk.try_parse('GFORM'), (None, 'gfyear-unset'))
+        self.assertEqual(tk.try_parse('GFORM', '2016'), (None, 'gfyear-type'))
+        self.assertEqual(tk.try_parse('GFORM', 20160), (None, 'gfyear'))
+
+    @log_capture()
+    def test_parse_2021(self, l):
+        self.assertEqual(tk.try_parse('FORM2021'), (('FORM', 2020), None))
+        l.check(('tktitler', 'WARNING',
+                 'While parsing an alias, the technically ambiguous postfix '
+                 '2021 was met. It it assumed it means 2020/2021.'))
+
+    def test_huge_numbers(self):
+        huge = 10 ** 5000
+        self.assertEqual(tk.try_validate(('FORM', huge)), (None, 'period'))
+        self.assertEqual(tk.try_validate(('FORM', -huge)), (None, 'period'))
+        self.assertEqual(tk.try_parse('FORM', huge), (None, 'gfyear'))
+        self.assertEqual(tk.try_parse('T%sOFORM' % ('9' * 5000), 2016),
+                         (None, 'prefix'))
+        self.assertEqual(tk.try_parse('G%sFORM' % ('1' * 5000), 2016),
+                         (None, 'prefix'))
+        with self.assertRaises(ValueError):
+            tk.parse('T%sOFORM' % ('9' * 5000), 2016)
+
+    def test_validate(self):
+        self.assertEqual(tk.try_validate(('FORM', 2011)),
+                         (('FORM', 2011), None))
+        self.assertEqual(tk.try_validate((0, 2011)), (None, 'root-type'))
+        self.assertEqual(tk.try_validate(('FORM', 2011.)),
+                         (None, 'period-type'))
+        self.assertEqual(tk.try_validate(('FORM', 11)), (None, 'period'))
+        self.assertEqual(tk.try_validate(('FORM',)), (None, 'title-type'))
+        self.assertEqual(tk.try_validate(42), (None, 'title-type'))
+
+    def test_validate_many(self):
+        self.assertEqual(
+            tk.validate_many([('FORM', 2011), ('FORM', 11), ['CERM', 2012]]),
+            [None, 'period', None])
+
+
+class TestGenerateCorpus(unittest.TestCase):
+    def test_length(self):
+        self.assertEqual(len(list(tk.generate_corpus(100, seed=1,
+                                                     gfyear=2016))), 100)
+
+    def test_seed(self):
+        a = list(tk.generate_corpus(50, seed=2, gfyear=2016))
+        b = list(tk.generate_corpus(50, seed=2, gfyear=2016))
+        self.assertEqual(a, b)
+
+    def test_lazy(self):
+        corpus = tk.generate_corpus(None, seed=3, gfyear=2016)
+        self.assertEqual(len([next(corpus) for _ in range(10)]), 10)
+
+    def test_titles(self):
+        for alias in tk.generate_corpus(200, seed=4, mix={'title': 1},
+                                        gfyear=2016):
+            self.assertEqual(tk.try_parse(alias, 2016)[1], None)
+
+    def test_ambiguous(self):
+        for alias in tk.generate_corpus(20, seed=5, mix={'ambiguous': 1},
+                                        gfyear=2016):
+            self.assertEqual(tk.try_parse(alias, 2016), (None, 'ambiguous'))
+
+    def test_2021(self):
+        for alias in tk.generate_corpus(20, seed=6, mix={'2021': 1},
+                                        gfyear=2016):
+            self.assertTrue(alias.endswith('2021'))
+
+    def test_long(self):
+        for alias in tk.generate_corpus(20, seed=7, mix={'long': 1},
+                                        gfyear=2016):
+            self.assertGreater(len(alias), 100)
+
+    def test_invalid_kind(self):
+        with self.assertRaisesRegex(ValueError, "'spam' is not a valid kind"):
+            list(tk.generate_corpus(1, mix={'spam': 1}, gfyear=2016))
+
+    def test_invalid_weights(self):
+        with self.assertRaisesRegex(ValueError,
+                                    "must not all be zero"):
+            list(tk.generate_corpus(1, mix={'title': 0, 'noise': 0},
+                                    gfyear=2016))
+        with self.assertRaisesRegex(ValueError,
+                                    "must not all be zero"):
+            list(tk.generate_corpus(1, mix={}, gfyear=2016))
+        with self.assertRaisesRegex(ValueError,
+                                    "'-1' is not a valid weight"):
+            list(tk.generate_corpus(1, mix={'title': 2, 'noise': -1},
+                                    gfyear=2016))
+        with self.assertRaisesRegex(ValueError,
+                                    "'nan' is not a valid weight"):
+            list(tk.generate_corpus(1, mix={'title': float('nan')},
+                                    gfyear=2016))
+
+    def test_zero_weight(self):
+        corpus = tk.generate_corpus(50, seed=1, mix={'title': 0, 'long': 1},
+                                    gfyear=2016)
+        for alias in corpus:
+            self.assertGreater(len(alias), 100)
+
+    def test_custom_type_not_used(self):
+        expected = list(tk.generate_corpus(200, seed=3, mix={'title': 1},
+                                           gfyear=2016))
+        tk.register_postfix_type('roman', lambda period, space: 'MMXI')
+        try:
+            self.assertEqual(
+                list(tk.generate_corpus(200, seed=3, mix={'title': 1},
+                                        gfyear=2016)),
+                expected)
+        finally:
+            tk.unregister_postfix_type('roman')
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'tktitler.sock')
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            tk._start_server(self.path, 2016))
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        self.client = tk.connect(self.path)
+
+    def tearDown(self):
+        self.client.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rmdir(self.dir)
+
+    def test_parse(self):
+        self.assertEqual(self.client.parse('GFORM'), ('FORM', 2015))
+        self.assertEqual(self.client.parse('GFORM', 2020), ('FORM', 2019))
+
+    def test_parse_error(self):
+        with self.assertRaisesRegex(ValueError, 'ambiguous'):
+            self.client.parse('FUAAA11')
+
+    def test_email(self):
+        self.assertEqual(self.client.email(('FUHØ', 2010)), 'FUHOE10')
+        self.assertEqual(self.client.email(('FUHØ', 2010), type='prefix'),
+                         'T3OFUHOE')
+
+    def test_prefix(self):
+        self.assertEqual(self.client.prefix(('KASS', 2011), type='unicode'),
+                         'T²OKA$$')
+
+    def test_prefix_error(self):
+        with self.assertRaisesRegex(ValueError, "'11' is not a valid period"):
+            self.client.prefix(('KASS', 11))
+
+    def test_batch(self):
+        self.assertEqual(self.client.batch([
+            {'op': 'parse', 'alias': 'FORM11', 'id': 1},
+            {'op': 'email', 'title': ['FORM', 2011], 'id': 2},
+            {'op': 'unknown'},
+            'nonsense',
+        ]), [
+            {'id': 1, 'result': ['FORM', 2011]},
+            {'id': 2, 'result': 'FORM11'},
+            {'error': 'op'},
+            {'error': 'request'},
+        ])
+
+    def test_pipelined(self):
+        f = self.client._file
+        f.write(b'{"op": "parse", "alias": "FORM11"}\n'
+                b'not json\n'
+                b'{"op": "parse", "alias": "BCERM"}\n')
+        f.flush()
+        self.assertEqual(f.readline(), b'{"result": ["FORM", 2011]}\n')
+        self.assertEqual(f.readline(), b'{"error": "json"}\n')
+        self.assertEqual(f.readline(), b'{"result": ["CERM", 2014]}\n')
+
+    def test_deeply_nested(self):
+        f = self.client._file
+        f.write(b'[' * 200000 + b'\n'
+                b'{"op": "parse", "alias": "FORM11"}\n')
+        f.flush()
+        self.assertEqual(f.readline(), b'{"error": "json"}\n')
+        self.assertEqual(f.readline(), b'{"result": ["FORM", 2011]}\n')
+
+    def test_large_batch(self):
+        requests = [{'op': 'parse', 'alias': 'GFORM%d' % i, 'id': i}
+                    for i in range(3000)]
+        self.assertGreater(len(str(requests)), 65536)
+        responses = self.client.batch(requests)
+        self.assertEqual(len(responses), 3000)
+        self.assertEqual(responses[11], {'id': 11, 'result': ['FORM', 2010]})
+
+    def test_too_long(self):
+        path = os.path.join(self.dir, 'small.sock')
+        server = asyncio.run_coroutine_threadsafe(
+            tk._start_server(path, 2016, limit=1024), self.loop).result()
+        try:
+            with tk.connect(path) as client:
+                f = client._file
+                f.write(b'[' + b' ' * 200000 + b']\n'
+                        b'{"op": "parse", "alias": "FORM11"}\n')
+                f.flush()
+                self.assertEqual(f.readline(), b'{"error": "too-long"}\n')
+                self.assertEqual(f.readline(),
+                                 b'{"result": ["FORM", 2011]}\n')
+        finally:
+            self.loop.call_soon_threadsafe(server.close)
+            os.remove(path)
+
+
+class CacheTests(object):
+    def tearDown(self):
+        tk.set_cache(None)
+
+    def test_parse(self):
+        self.assertEqual(tk.parse('GFORM', 2016), ('FORM', 2015))
+        self.assertEqual(tk.parse('GFORM', 2016), ('FORM', 2015))
+        self.assertEqual(tk.parse('GFORM', 2017), ('FORM', 2016))
+        self.assertEqual(tk.parse('FORM11'), ('FORM', 2011))
+
+    def test_parse_cached(self):
+        self.cache.set_many({('parse', 2016, 'GFORM'): ['CERM', 2000]})
+        self.assertEqual(tk.parse('GFORM', 2016), ('CERM', 2000))
+        self.assertEqual(tk.parse('GFORM', 2017), ('FORM', 2016))
+
+    def test_parse_context(self):
+        with tk.set_gfyear(2016):
+            self.assertEqual(tk.parse('GFORM'), ('FORM', 2015))
+        with tk.set_gfyear(2017):
+            self.assertEqual(tk.parse('GFORM'), ('FORM', 2016))
+
+    def test_parse_error(self):
+        with self.assertRaises(ValueError):
+            tk.parse('FUAAA11')
+        with self.assertRaises(ValueError):
+            tk.parse('FUAAA11')
+
+    @log_capture()
+    def test_parse_2021(self, l):
+        warning = ('tktitler', 'WARNING',
+                   'While parsing an alias, the technically ambiguous '
+                   'postfix 2021 was met. It it assumed it means 2020/2021.')
+        for _ in range(2):
+            self.assertEqual(tk.parse('FORM 2021'), ('FORM', 2020))
+            self.assertEqual(tk.parse_relative('FORM2021').postfix_year,
+                             2020)
+            self.assertEqual(tk.parse('FORM 2020/2021'), ('FORM', 2020))
+            self.assertEqual(tk.parse('FORM2021\n'), ('FORM', 2020))
+        l.check(*[warning] * 6)
+
+    def test_parse_relative(self):
+        for _ in range(2):
+            r = tk.parse_relative('GFUOEP')
+            self.assertEqual(r.resolve(2016), ('FUØP', 2015))
+            self.assertEqual(r.resolve(2017), ('FUØP', 2016))
+        self.assertIn(('relative', None, 'GFUOEP'),
+                      self.cache.get_many([('relative', None, 'GFUOEP')]))
+
+    def test_prefix_email(self):
+        for _ in range(2):
+            self.assertEqual(tk.prefix(('KASS', 2011), 2016), 'T2OKA$$')
+            self.assertEqual(tk.prefix(('KASS', 2011), 2016, type='tex'),
+                             'T$^{2}$OKA\\$\\$')
+            self.assertEqual(tk.email(('FUHØ', 2010), 2016), 'FUHOE10')
+            self.assertEqual(tk.email(('FUHØ', 2010), 2016, type='prefix'),
+                             'T3OFUHOE')
+
+    @log_capture()
+    def test_email_warning(self, l):
+        warning = ('tktitler', 'WARNING',
+                   'Returning an EFUIT email with postfix. The postfix does '
+                   'not necessarily represent the actual year the given '
+                   'EFUIT was EFUIT.')
+        for _ in range(2):
+            self.assertEqual(tk.email(('EFUIT', 2011), 2016), 'EFUIT11')
+            self.assertEqual(tk.email(('EFUIT', 2011), 2016, type='prefix'),
+                             'T2OEFUIT')
+        l.check(warning, warning)
+
+    def test_invalidate(self):
+        tk.parse('GFORM', 2016)
+        tk.parse('GFORM', 2017)
+        key16 = ('parse', 2016, 'GFORM')
+        key17 = ('parse', 2017, 'GFORM')
+        self.assertEqual(len(self.cache.get_many([key16, key17])), 2)
+        self.cache.invalidate(2016)
+        self.assertEqual(list(self.cache.get_many([key16, key17])), [key17])
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_many([key16, key17]), {})
+
+
+class TestMemoryCache(CacheTests, unittest.TestCase):
+    def setUp(self):
+        self.cache = tk.memory_cache()
+        tk.set_cache(self.cache)
+
+    def test_maxsize(self):
+        cache = tk.memory_cache(maxsize=2)
+        cache.set_many({('parse', 2016, 'A'): 1, ('parse', 2016, 'B'): 2})
+        cache.get_many([('parse', 2016, 'A')])
+        cache.set_many({('parse', 2016, 'C'): 3})
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(
+            cache.get_many([('parse', 2016, k) for k in 'ABC']),
+            {('parse', 2016, 'A'): 1, ('parse', 2016, 'C'): 3})
+
+    def test_maxsize_parse(self):
+        self.cache = tk.memory_cache(maxsize=100)
+        tk.set_cache(self.cache)
+        for i in range(1000):
+            spam = ''.join(chr(ord('A') + int(d)) for d in str(i))
+            self.assertEqual(tk.parse('SPAM' + spam, 2016)[1], 2016)
+        self.assertEqual(len(self.cache), 100)
+
+    def test_invalid_maxsize(self):
+        with self.assertRaisesRegex(ValueError,
+                                    "'-1' is not a valid maxsize"):
+            tk.memory_cache(maxsize=-1)
+
+
+class TestSQLiteCache(CacheTests, unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.cache = tk.sqlite_cache(self.path, batch_size=2)
+        tk.set_cache(self.cache)
+
+    def tearDown(self):
+        super().tearDown()
+        self.cache.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_persistent(self):
+        tk.parse('GFUHOE', 2016)
+        self.cache.close()
+        self.cache = tk.sqlite_cache(self.path)
+        self.assertEqual(
+            self.cache.get_many([('parse', 2016, 'GFUHOE')]),
+            {('parse', 2016, 'GFUHOE'): ['FUHØ', 2015]})
+        tk.set_cache(self.cache)
+        self.assertEqual(tk.parse('GFUHOE', 2016), ('FUHØ', 2015))
+
+
+class TestSQLiteFunctions(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE roster (root TEXT, period INTEGER)')
+        self.conn.executemany('INSERT INTO roster VALUES (?, ?)', [
+            ('FORM', 2015), ('KASS', 2011), ('FUHØ', 2010), ('CERM', 2017)])
+        tk.register_sqlite_functions(self.conn, 2016)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def query(self, sql, *args):
+        return self.conn.execute(sql, args).fetchall()
+
+    def test_prefix(self):
+        self.assertEqual(
+            self.query('SELECT tk_prefix(root, period) FROM roster '
+                       'ORDER BY period'),
+            [('T3OFUHØ',), ('T2OKA$$',), ('GFORM',), ('KCERM',)])
+
+    def test_types(self):
+        self.assertEqual(
+            self.query("SELECT tk_prefix('FORM', 2010, 'unicode'), "
+                       "tk_postfix('FORM', 2010, 'slash'), "
+                       "tk_email('FUHØ', 2010, 'prefix')"),
+            [('T³OFORM', 'FORM 10/11', 'T3OFUHOE')])
+
+    def test_where(self):
+        self.assertEqual(
+            self.query('SELECT root FROM roster '
+                       'WHERE tk_email(root, period) = ?', 'FUHOE10'),
+            [('FUHØ',)])
+
+    def test_parse(self):
+        self.assertEqual(
+            self.query("SELECT tk_parse_root('T2OKA$$'), "
+                       "tk_parse_period('T2OKA$$')"),
+            [('KASS', 2011)])
+
+    def test_invalid(self):
+        self.assertEqual(
+            self.query("SELECT tk_prefix('FORM', 11), tk_prefix(NULL, 2011), "
+                       "tk_postfix('FORM', 2011, 'foo'), "
+                       "tk_parse_root('FUAAA11')"),
+            [(None, None, None, None)])
+
+    def test_gfyear_fixed(self):
+        conn = sqlite3.connect(':memory:')
+        with tk.set_gfyear(2016):
+            tk.register_sqlite_functions(conn)
+        with tk.set_gfyear(2020):
+            self.assertEqual(
+                conn.execute("SELECT tk_prefix('FORM', 2015)").fetchall(),
+                [('GFORM',)])
+        conn.close()
+
+    def test_no_gfyear(self):
+        conn = sqlite3.connect(':memory:')
+        tk.register_sqlite_functions(conn)
+        with tk.set_gfyear(2020):
+            self.assertEqual(
+                conn.execute("SELECT tk_prefix('FORM', 2015), "
+                             "tk_postfix('FORM', 2015)").fetchall(),
+                [(None, 'FORM15')])
+        conn.close()
+
+
+class TestCompletionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = tk.completion_index(
+            [('FORM', 2015), ('FUHØ', 2015), ('FUAN', 2010), ('KASS', 2012)],
+            2016)
+
+    def test_prefix(self):
+        self.assertEqual(self.index.complete('gf'),
+                         [('GFORM', ('FORM', 2015)),
+                          ('GFUHOE', ('FUHØ', 2015)),
+                          ('GFUHØ', ('FUHØ', 2015))])
+
+    def test_postfix(self):
+        self.assertEqual(self.index.complete('FORM1'),
+                         [('FORM15', ('FORM', 2015)),
+                          ('FORM 15/16', ('FORM', 2015)),
+                          ('FORM1516', ('FORM', 2015))])
+
+    def test_postfix_types(self):
+        self.assertEqual(self.index.complete('FORM 15/'),
+                         [('FORM 15/16', ('FORM', 2015))])
+        self.assertEqual(self.index.complete('FORM 2015'),
+                         [('FORM 2015/16', ('FORM', 2015))])
+        self.assertEqual(self.index.complete('fuhoe2015'),
+                         [('FUHOE 2015/16', ('FUHØ', 2015))])
+
+    def test_funny(self):
+        self.assertEqual(self.index.complete('TOKA$'),
+                         [('TOKA$$', ('KASS', 2012))])
+        self.assertEqual(self.index.complete('TOKAS'),
+                         [('TOKA$$', ('KASS', 2012))])
+
+    def test_custom_postfix_type(self):
+        tk.register_postfix_type('roman', lambda period, space: 'MMXV')
+        try:
+            index = tk.completion_index([('FORM', 2015)], 2016)
+        finally:
+            tk.unregister_postfix_type('roman')
+        self.assertEqual(index.complete('FORMM'), [])
+
+    def test_normalize(self):
+        self.assertEqual(self.index.complete('fuhø15', k=1),
+                         [('FUHØ15', ('FUHØ', 2015))])
+        self.assertEqual(self.index.complete('fuhoe', k=1),
+                         [('FUHOE15', ('FUHØ', 2015))])
+
+    def test_k(self):
+        self.assertEqual(len(self.index.complete('', k=3)), 3)
+        self.assertEqual(self.index.complete('F', k=1),
+                         [('FORM15', ('FORM', 2015))])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.complete('VC'), [])
+
+    def test_set_gfyear(self):
+        self.index.set_gfyear(2017)
+        self.assertEqual(self.index.complete('gf'), [])
+        self.assertEqual(self.index.complete('bf'),
+                         [('BFORM', ('FORM', 2015)),
+                          ('BFUHOE', ('FUHØ', 2015)),
+                          ('BFUHØ', ('FUHØ', 2015))])
+        self.assertEqual(self.index.complete('FORM', k=1),
+                         [('FORM15', ('FORM', 2015))])
+
+    def test_add_remove(self):
+        self.index.add(('VC', 2016))
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.complete('VC', k=2),
+                         [('VC', ('VC', 2016)), ('VC16', ('VC', 2016))])
+        self.assertEqual(len(self.index.complete('VC')), 5)
+        self.index.remove(('VC', 2016))
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.complete('VC'), [])
+
+    def test_gfyear_context(self):
+        with tk.set_gfyear(2016):
+            index = tk.completion_index([('FORM', 2015)])
+        self.assertEqual(index.complete('G'), [('GFORM', ('FORM', 2015))])
+
+
+class TestTimeline(unittest.TestCase):
+    def test_matches_prefix(self):
+        for title in [('FORM', 2010), ('KASS', 2015), ('FUHØ', 1960),
+                      ('EFUIT', 2001)]:
+            for type in ('normal', 'unicode', 'tex'):
+                gfyears = range(1950, 2030)
+                self.assertEqual(
+                    tk.timeline(title, gfyears, type=type),
+                    [tk.prefix(title, y, type=type) for y in gfyears])
+
+    def test_default_gfyears(self):
+        with tk.set_gfyear(2012):
+            self.assertEqual(tk.timeline(('CERM', 2010)),
+                             ['CERM', 'GCERM', 'BCERM'])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            tk.timeline(('FORM', 'x'), [2016])
+        with self.assertRaisesRegex(ValueError, "'foo' is not a valid type"):
+            tk.timeline(('FORM', 2010), [2016], type='foo')
+
+    def test_timelines(self):
+        roster = [('FORM', 2015), ('KASS', 2010), ('FUHØ', 2016)]
+        result = tk.timelines(roster, range(2014, 2020), type='tex')
+        self.assertFalse(isinstance(result, list))
+        self.assertEqual(
+            list(result),
+            [(title, tk.timeline(title, range(2014, 2020), type='tex'))
+             for title in roster])
+
+    def test_timelines_default_gfyears(self):
+        with tk.set_gfyear(2016):
+            self.assertEqual(list(tk.timelines([('FORM', 2015),
+                                                ('CERM', 2016)])),
+                             [(('FORM', 2015), ['FORM', 'GFORM']),
+                              (('CERM', 2016), ['CERM'])])
+
+
+class TestRoster(unittest.TestCase):
+    def setUp(self):
+        self.roster = tk.roster([(1, ('FORM', 2015)), (2, ('KASS', 2015)),
+                                 (3, ('FORM', 2014))])
+
+    def test_lookup(self):
+        self.assertEqual(self.roster.lookup('GFORM', 2016), [1])
+        self.assertEqual(self.roster.lookup('BFORM', 2016), [3])
+        self.assertEqual(self.roster.lookup('KA$$ 2015/16'), [2])
+        self.assertEqual(self.roster.lookup('CERM15'), [])
+        with tk.set_gfyear(2015):
+            self.assertEqual(self.roster.lookup('GFORM'), [3])
+
+    def test_lookup_error(self):
+        with self.assertRaises(ValueError):
+            self.roster.lookup('FUAAA11')
+
+    def test_lookup_many(self):
+        self.assertEqual(
+            self.roster.lookup_many(['GFORM', 'GKASS', 'BFORM', 'GCERM'],
+                                    2016),
+            [[1], [2], [3], []])
+
+    def test_indexes(self):
+        self.assertEqual(sorted(self.roster.by_root('FORM')), [1, 3])
+        self.assertEqual(sorted(self.roster.by_period(2015)), [1, 2])
+        self.assertEqual(self.roster.by_title(('KASS', 2015)), [2])
+        self.assertEqual(self.roster.by_root('CERM'), [])
+        self.assertEqual(self.roster.title(3), ('FORM', 2014))
+
+    def test_add(self):
+        self.roster.add(4, ('FORM', 2015))
+        self.assertEqual(sorted(self.roster.lookup('FORM15')), [1, 4])
+        self.assertEqual(len(self.roster), 4)
+        self.assertIn(4, self.roster)
+
+    def test_edit(self):
+        self.roster.add(1, ('CERM', 2015))
+        self.assertEqual(self.roster.lookup('FORM15'), [])
+        self.assertEqual(self.roster.lookup('CERM15'), [1])
+        self.assertEqual(sorted(self.roster.by_root('FORM')), [3])
+        self.assertEqual(len(self.roster), 3)
+
+    def test_remove(self):
+        self.roster.remove(2)
+        self.assertEqual(self.roster.lookup('KASS15'), [])
+        self.assertEqual(self.roster.by_root('KASS'), [])
+        self.assertEqual(sorted(self.roster.by_period(2015)), [1])
+        self.assertNotIn(2, self.roster)
+        with self.assertRaises(KeyError):
+            self.roster.remove(2)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.roster.add(5, ('FORM', 'x'))
+        self.assertNotIn(5, self.roster)
+
+    def test_iter(self):
+        self.assertEqual(sorted(self.roster),
+                         [(1, ('FORM', 2015)), (2, ('KASS', 2015)),
+                          (3, ('FORM', 2014))])
+
+
+class TestPipeline(unittest.TestCase):
+    def test_chain(self):
+        source = ['GFORM', 'john.doe', 'KA$$ 2012/13', 'FUHOE15', 'ABEN12',
+                  'FUAAA11']
+        result = (tk.pipeline(source, chunk_size=2)
+                  .normalize()
+                  .parse(gfyear=2016, errors='skip')
+                  .filter(known_only=True)
+                  .render('email', gfyear=2016)
+                  .batch(2))
+        self.assertEqual(list(result), [['FORM15', 'KASS12'], ['FUHOE15']])
+
+    def test_normalize(self):
+        self.assertEqual(list(tk.pipeline(['t²okA$$', 'ℂERM'])
+                              .normalize()),
+                         ['T2OKASS', 'CERM'])
+
+    def test_parse_matches(self):
+        aliases = ['GFORM', 'BBEST/FU', 'FUAEU', 'T³OCERM', 'KUNDESERVICE']
+        self.assertEqual(list(tk.pipeline(aliases).parse(2021)),
+                         [tk.parse(a, 2021) for a in aliases])
+
+    def test_parse_raise(self):
+        with self.assertRaises(ValueError):
+            list(tk.pipeline(['FORM', 'FUAAA11']).parse(2016))
+
+    def test_parse_context(self):
+        p = tk.pipeline(['GFORM']).parse()
+        with tk.set_gfyear(2016):
+            self.assertEqual(list(p), [('FORM', 2015)])
+
+    def test_parse_skip_gfyear_unset(self):
+        self.assertEqual(list(tk.pipeline(['FORM11']).parse(errors='skip')),
+                         [('FORM', 2011)])
+        with self.assertRaisesRegex(ValueError, 'No context gfyear set'):
+            list(tk.pipeline(['FORM11', 'GFORM']).parse(errors='skip'))
+
+    def test_parse_invalid_errors(self):
+        with self.assertRaises(ValueError):
+            tk.pipeline([]).parse(2016, errors='ignore')
+
+    def test_filter_predicate(self):
+        self.assertEqual(list(tk.pipeline(range(10))
+                              .filter(lambda x: x % 3 == 0)),
+                         [0, 3, 6, 9])
+
+    def test_render_many(self):
+        self.assertEqual(list(tk.pipeline([('FORM', 2015)])
+                              .render('prefix', 'postfix', gfyear=2016)),
+                         [{'prefix': 'GFORM', 'postfix': 'FORM15'}])
+
+    def test_lazy(self):
+        consumed = []
+
+        def source():
+            for i in range(10):
+                consumed.append(i)
+                yield ('CERM', 2010 + i)
+
+        batches = tk.pipeline(source(), chunk_size=3).render(
+            'postfix', gfyear=2016).batch(3)
+        self.assertEqual(consumed, [])
+        self.assertEqual(next(batches), ['CERM10', 'CERM11', 'CERM12'])
+        self.assertEqual(consumed, [0, 1, 2])
+
+    def test_batch(self):
+        self.assertEqual(list(tk.pipeline(range(7), chunk_size=3).batch(4)),
+                         [[0, 1, 2, 3], [4, 5, 6]])
+        self.assertEqual(list(tk.pipeline([]).batch(4)), [])
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy_imports(self):
+        code = ('import sys; sys.path.insert(0, %r); '
+                'before = set(sys.modules); import tktitler; '
+                'print(" ".join(set(sys.modules) - before))'
+                % os.path.dirname(os.path.abspath(tk.__file__)))
+        output = subprocess.check_output([sys.executable, '-S', '-c', code],
+                                         universal_newlines=True)
+        imported = set(output.split())
+        for module in ('json', 'mmap', 'random', 'socket', 'asyncio',
+                       'argparse', 'logging'):
+            self.assertNotIn(module, imported)
+
+    def test_warm(self):
+        tk.warm()
+        self.assertIsNotNone(tk._alias_patterns)
+
+    def test_logger(self):
+        self.assertIn('logger', vars(tk))
+        self.assertEqual(tk.logger.name, 'tktitler')
+        self.assertIs(tk.logger.manager, tk._get_logger().manager)
+
+    def test_logger_setattr(self):
+        import logging
+
+        logger = logging.getLogger('tktitler')
+        self.assertIsInstance(tk.logger, logging.Logger)
+        tk.logger.propagate = False
+        try:
+            self.assertFalse(logger.propagate)
+        finally:
+            tk.logger.propagate = True
+        self.assertTrue(logger.propagate)
+        tk.logger.custom = 1
+        self.assertEqual(logger.custom, 1)
+        del tk.logger.custom
+        self.assertFalse(hasattr(logger, 'custom'))
+
+
+class TestParity(unittest.TestCase):
+    def setUp(self):
+        self.mismatches = []
+
+    def tearDown(self):
+        tk.disable_parity_check()
+
+    def callback(self, *args):
+        self.mismatches.append(args)
+
+    def test_reference(self):
+        self.assertEqual(tk.reference.parse('T2OKA$$', 2016), ('KASS', 2011))
+        self.assertEqual(tk.reference.parse('FUAEU', 2021), ('FUÄU', 2021))
+        self.assertEqual(tk.reference.parse('FORM2021'), ('FORM', 2020))
+        self.assertEqual(tk.reference.email(('FUÆU', 2021), 2021), 'FUÆU21')
+        self.assertEqual(tk.reference.prefix(('KASS', 2010), 2016,
+                                             type='tex'),
+                         'T$^{3}$OKA\\$\\$')
+        with self.assertRaisesRegex(ValueError, "FUAAA is an ambiguous"):
+            tk.reference.parse('FUAAA11')
+
+    def test_no_mismatch(self):
+        tk.enable_parity_check(1, self.callback)
+        for alias in ('T2OKA$$', 'FUAEU', 'FORM2021', 'BBEST/FU', 'G3OKFORM13',
+                      'KUNDESERVICE', 'FUHOE 2011/12'):
+            tk.parse(alias, 2021)
+        tk.prefix(('KASS', 2010), 2016, type='unicode')
+        tk.kprefix(('CERM', 2017), 2015)
+        tk.postfix(('FUHØ', 2011), type='longslash')
+        tk.prepostfix(('KASS', 2011), 2016, prefixtype='tex')
+        tk.email(('FUÄU', 2021), 2022, type='prefix')
+        with self.assertRaises(ValueError):
+            tk.parse('FUAAA11')
+        self.assertEqual(self.mismatches, [])
+
+    def test_mismatch(self):
+        with unittest.mock.patch.object(tk.reference, 'parse',
+                                        lambda alias, gfyear=None: ('X', 1)):
+            tk.enable_parity_check(1, self.callback)
+            self.assertEqual(tk.parse('GFORM', 2016), ('FORM', 2015))
+        self.assertEqual(self.mismatches, [
+            ('parse', ('GFORM', 2016), {}, ('FORM', 2015), ('X', 1))])
+
+    def test_mismatch_exception(self):
+        with unittest.mock.patch.object(tk.reference, 'parse',
+                                        lambda alias, gfyear=None: ('X', 1)):
+            tk.enable_parity_check(1, self.callback)
+            with self.assertRaises(ValueError):
+                tk.parse('FUAAA11')
+        (name, args, kwargs, result, expected), = self.mismatches
+        self.assertIsInstance(result, ValueError)
+        self.assertEqual(expected, ('X', 1))
+
+    def test_custom_type_skipped(self):
+        with unittest.mock.patch.dict(tk._PREFIX_TYPES,
+                                      {'dot': (lambda n: '.%s' % n, None)}):
+            tk.enable_parity_check(1, self.callback)
+            self.assertEqual(tk.prefix(('FORM', 2010), 2016, type='dot'),
+                             'T.3OFORM')
+        self.assertEqual(self.mismatches, [])
+
+    def test_rate(self):
+        with unittest.mock.patch.object(tk.reference, 'parse',
+                                        lambda alias, gfyear=None: ('X', 1)):
+            tk.enable_parity_check(0.5, self.callback, seed=1)
+            for _ in range(200):
+                tk.parse('GFORM', 2016)
+        self.assertTrue(50 < len(self.mismatches) < 150)
+
+    @log_capture()
+    def test_default_callback(self, logcapture):
+        with unittest.mock.patch.object(tk.reference, 'email',
+                                        lambda *a, **k: 'X'):
+            tk.enable_parity_check(1)
+            tk.email(('FORM', 2015), 2016)
+        self.assertIn("email(('FORM', 2015), 2016) returned 'FORM15', but the "
+                      "reference returned 'X'",
+                      str(logcapture))
+
+    def test_disable(self):
+        tk.enable_parity_check(1, self.callback)
+        self.assertIsNot(tk.parse, tk._ORIGINALS['parse'])
+        tk.disable_parity_check()
+        self.assertIs(tk.parse, tk._ORIGINALS['parse'])
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            tk.enable_parity_check(2)
+
+
+class TestCountTitles(unittest.TestCase):
+    def test_exact(self):
+        aliases = ['GFORM', 'FORM15', 'gform', 'KA$$ 15/16', 'BKASS',
+                   'FUHOE15', 'GFUHØ']
+        self.assertEqual(tk.count_titles(aliases, 2016),
+                         {('FORM', 2015): 3, ('KASS', 2015): 1,
+                          ('KASS', 2014): 1, ('FUHØ', 2015): 2})
+
+    def test_matches_parse(self):
+        aliases = list(tk.generate_corpus(2000, seed=1, gfyear=2016))
+        expected = {}
+        for alias in aliases:
+            r, error = tk.try_parse(alias, 2016)
+            if r is not None:
+                expected[r] = expected.get(r, 0) + 1
+        self.assertEqual(tk.count_titles(aliases, 2016), expected)
+
+    def test_skip_invalid(self):
+        self.assertEqual(tk.count_titles(['FUAAA11', 'FORM1113'], 2016), {})
+
+    def test_known_only(self):
+        self.assertEqual(tk.count_titles(['GFORM', 'john.doe', 'ABEN'], 2016,
+                                         known_only=True),
+                         {('FORM', 2015): 1})
+
+    def test_gfyear(self):
+        with tk.set_gfyear(2016):
+            self.assertEqual(tk.count_titles(['GFORM']), {('FORM', 2015): 1})
+        self.assertEqual(tk.count_titles(['FORM15']), {('FORM', 2015): 1})
+        with self.assertRaises(ValueError):
+            tk.count_titles(['FORM15', 'GFORM'])
+
+    def test_top_k(self):
+        aliases = ['GFORM'] * 50 + ['CERM%02d' % (i % 100)
+                                    for i in range(100)] + ['KASS15'] * 40
+        counts = tk.count_titles(aliases, 2016, top_k=5)
+        self.assertEqual(len(counts), 5)
+        # Titles occurring more than n / k times are always counted, and
+        # the counts overestimate by at most n / k.
+        for title, count in ((('FORM', 2015), 50), (('KASS', 2015), 40)):
+            self.assertGreaterEqual(counts[title], count)
+            self.assertLessEqual(counts[title], count + 190 // 5)
+
+    def test_top_k_invariants(self):
+        rng = random.Random(3)
+        aliases = ['FORM%02d' % int(rng.paretovariate(1) * 3 % 100)
+                   for _ in range(5000)]
+        exact = tk.count_titles(aliases, 2016)
+        for k in (1, 3, 10, 50):
+            counts = tk.count_titles(aliases, 2016, top_k=k)
+            self.assertLessEqual(len(counts), k)
+            self.assertEqual(sum(counts.values()), len(aliases))
+            for title, count in counts.items():
+                self.assertGreaterEqual(count, exact[title])
+                self.assertLessEqual(count, exact[title] + len(aliases) // k)
+            for title, count in exact.items():
+                if count > len(aliases) // k:
+                    self.assertIn(title, counts)
+
+    def test_failures_cached(self):
+        with unittest.mock.patch.object(
+                tk, 'parse_relative', wraps=tk.parse_relative) as mock:
+            tk.count_titles(['FORM1113'] * 10 + ['FUAAA11'] * 10, 2016)
+        self.assertEqual(mock.call_count, 2)
+
+    def test_top_k_exact_when_few(self):
+        aliases = ['GFORM', 'GKASS', 'GFORM']
+        self.assertEqual(tk.count_titles(aliases, 2016, top_k=10),
+                         tk.count_titles(aliases, 2016))
+
+    def test_invalid_top_k(self):
+        with self.assertRaises(ValueError):
+            tk.count_titles([], 2016, top_k=0)
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.started = []
+        self.ended = []
+
+    def tearDown(self):
+        for hook in tk._hooks:
+            tk.remove_hook(hook)
+
+    def add_hook(self, **kwargs):
+        return tk.add_hook(self.started.append, self.ended.append, **kwargs)
+
+    def test_parse(self):
+        self.add_hook()
+        self.assertEqual(tk.parse('GFORM', 2016), ('FORM', 2015))
+        call, = self.ended
+        self.assertEqual(self.started, [call])
+        self.assertEqual(call.name, 'parse')
+        self.assertEqual(call.args, ('GFORM', 2016))
+        self.assertEqual(call.gfyear, 2016)
+        self.assertEqual(call.branch, 'known')
+        self.assertEqual(call.result, ('FORM', 2015))
+        self.assertIsNone(call.exception)
+        self.assertGreaterEqual(call.duration, 0)
+
+    def test_branch(self):
+        self.add_hook()
+        tk.parse('FUHOE11')
+        tk.parse('ABEN11')
+        self.assertEqual([c.branch for c in self.ended],
+                         ['escaped', 'unknown'])
+
+    def test_gfyear_context(self):
+        self.add_hook()
+        with tk.set_gfyear(2017):
+            tk.email(('FORM', 2015))
+        tk.parse('FORM15')
+        self.assertEqual([(c.name, c.gfyear) for c in self.ended],
+                         [('validate_title', None), ('email', 2017),
+                          ('parse', None)])
+
+    def test_exception(self):
+        self.add_hook()
+        with self.assertRaises(ValueError):
+            tk.parse('FUAAA11')
+        call, = self.ended
+        self.assertIsInstance(call.exception, ValueError)
+        self.assertIsNone(call.result)
+
+    def test_functions(self):
+        self.add_hook()
+        tk.prefix(('FORM', 2015), 2016)
+        tk.postfix(('FORM', 2015))
+        tk.prepostfix(('FORM', 2015), 2016)
+        tk.validate_title(('FORM', 2015))
+        names = [c.name for c in self.ended]
+        for name in ('prefix', 'postfix', 'prepostfix', 'validate_title'):
+            self.assertIn(name, names)
+
+    def test_sample_rate(self):
+        self.add_hook(sample_rate=0.5, seed=1)
+        for _ in range(200):
+            tk.parse('GFORM', 2016)
+        self.assertTrue(50 < len(self.ended) < 150)
+        self.assertEqual(len(self.started), len(self.ended))
+
+    def test_remove(self):
+        hook = self.add_hook()
+        self.assertIsNot(tk.parse, tk._ORIGINALS['parse'])
+        tk.remove_hook(hook)
+        self.assertIs(tk.parse, tk._ORIGINALS['parse'])
+        tk.parse('GFORM', 2016)
+        self.assertEqual(self.ended, [])
+        with self.assertRaises(ValueError):
+            tk.remove_hook(hook)
+
+    def test_only_on_end(self):
+        tk.add_hook(on_end=self.ended.append)
+        tk.parse('GFORM', 2016)
+        self.assertEqual(len(self.ended), 1)
+
+    def test_with_parity_check(self):
+        mismatches = []
+        tk.enable_parity_check(1, lambda *args: mismatches.append(args))
+        try:
+            self.add_hook()
+            self.assertEqual(tk.parse('GFORM', 2016), ('FORM', 2015))
+            tk.disable_parity_check()
+            self.assertEqual(tk.parse('BFORM', 2016), ('FORM', 2014))
+        finally:
+            tk.disable_parity_check()
+        self.assertEqual([c.args for c in self.ended if c.name == 'parse'],
+                         [('GFORM', 2016), ('BFORM', 2016)])
+        self.assertEqual(mismatches, [])
+
+
 if __name__ == '__main__':
     unittest.main()
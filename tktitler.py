@@ -2,12 +2,57 @@ import tktitler as tk
 
 import re
 import abc
+import bisect
+import heapq
+import itertools
+import struct
 import functools
 import unicodedata
 
-import logging
+# Modules that are only needed by some functions (json, mmap, random,
+# socket, asyncio, argparse and logging) are imported on first use to keep
+# the import of tktitler cheap for short-lived processes.
+
+_logger = None
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        import logging
+
+        _logger = logging.getLogger(__name__)
+    return _logger
+
+
+def _warning(msg):
+    _get_logger().warning(msg)
+
+
+class _LazyLogger(object):
+    # Stands in for the logger until logging is imported, so that
+    # tk.logger stays a module attribute on all Python versions. Every
+    # attribute access goes to the real logger, and __class__ makes
+    # isinstance(tk.logger, logging.Logger) true.
+    @property
+    def __class__(self):
+        return type(_get_logger())
+
+    def __getattr__(self, name):
+        return getattr(_get_logger(), name)
+
+    def __setattr__(self, name, value):
+        setattr(_get_logger(), name, value)
+
+    def __delattr__(self, name):
+        delattr(_get_logger(), name)
+
+    def __repr__(self):
+        return repr(_get_logger())
+
+
+logger = _LazyLogger()
 
-logger = logging.getLogger(__name__)
 
 _gfyear = _GFYEAR_UNSET = object()
 
@@ -20,6 +65,76 @@ _SPECIAL_CASES = (
 )
 
 
+class _RootRegistry(object):
+    """Registry of interned title roots.
+
+    Roots that are already registered are returned as the registered
+    string object, so equal roots share one object. New roots are only
+    registered if ``admit(root)`` is true, so arbitrary strings parsed as
+    unknown roots do not fill up the registry. At most ``maxsize`` roots
+    are registered; further roots are returned unchanged.
+
+    Up to ``maxsize`` rejected roots are remembered, so that ``admit`` is
+    not called again for them. Call ``clear_rejected()`` when ``admit``
+    may have changed its mind.
+    """
+
+    def __init__(self, roots=(), maxsize=4096, admit=None):
+        self.maxsize = maxsize
+        self.admit = admit
+        self._roots = {}
+        self._rejected = set()
+        for root in roots:
+            self._roots[root] = root
+
+    def intern(self, root):
+        interned = self._roots.get(root)
+        if interned is not None:
+            return interned
+        if root in self._rejected or len(self._roots) >= self.maxsize:
+            return root
+        if self.admit is None or self.admit(root):
+            self._roots[root] = root
+        else:
+            if len(self._rejected) >= self.maxsize:
+                self._rejected.clear()
+            self._rejected.add(root)
+        return root
+
+    def clear_rejected(self):
+        self._rejected.clear()
+
+    def __contains__(self, root):
+        return root in self._roots
+
+    def __iter__(self):
+        return iter(self._roots)
+
+    def __len__(self):
+        return len(self._roots)
+
+
+_KNOWN_ROOTS = {'CERM', 'FORM', 'INKA', 'KASS', 'NF', 'PR', 'SEKR', 'VC',
+                'BEST', 'FU', 'BESTFU', 'EFUIT'}
+_BUILTIN_KNOWN_ROOTS = frozenset(_KNOWN_ROOTS)
+
+_KNOWN_FU_RE = re.compile(r'E?FU[A-Z%s]{2}\Z' % ''.join(DIGRAPHS.keys()))
+
+
+def _is_known_root(root):
+    return (root in _KNOWN_ROOTS or root in _SPECIAL_ROOT_NAMES or
+            _KNOWN_FU_RE.match(root) is not None)
+
+
+root_registry = _RootRegistry(_KNOWN_ROOTS, admit=_is_known_root)
+"""Registry over rødder returneret af :func:`parse` og :func:`validate_title`.
+
+Ens rødder deler samme str-objekt. Kun kendte rødder (se :func:`known_roots`)
+og rødder af formen FU eller EFU efterfulgt af to bogstaver registreres.
+``len(tk.root_registry)`` giver antallet af registrerede rødder.
+"""
+
+
 class _TitleABC(metaclass=abc.ABCMeta):
     pass
 
@@ -46,21 +161,38 @@ def get_gfyear(gfyear=None):
     75
     '''
 
-    if gfyear is None:
-        r = _gfyear
-    else:
-        r = gfyear
-    if r is _GFYEAR_UNSET:
+    r, error = _check_gfyear(gfyear)
+    if error == 'gfyear-unset':
         raise ValueError("No context gfyear set. Use the gfyear argument " +
                          "or set_gfyear.")
-    if not isinstance(r, int):
+    elif error == 'gfyear-type':
         raise TypeError(
             "%s is not a valid type for gfyear." % type(r).__name__)
-    if len(str(r)) != 4:
+    elif error == 'gfyear':
         raise ValueError("\'%s\' is not a valid gfyear" % r)
     return r
 
 
+def _check_gfyear(gfyear):
+    if gfyear is None:
+        r = _gfyear
+    else:
+        r = gfyear
+    if r is _GFYEAR_UNSET:
+        return r, 'gfyear-unset'
+    if not isinstance(r, int):
+        return r, 'gfyear-type'
+    if not _has_four_digits(r):
+        return r, 'gfyear'
+    return r, None
+
+
+def _has_four_digits(n):
+    # Same as len(str(n)) == 4, but without converting huge ints to str,
+    # which raises ValueError on Python 3.11+.
+    return 1000 <= n <= 9999 or (-999 <= n <= 999 and len(str(n)) == 4)
+
+
 class _Override(object):
     def __init__(self, context_gfyear):
         if callable(context_gfyear):
@@ -136,6 +268,197 @@ def set_gfyear(gfyear):
     return _Override(gfyear)
 
 
+_cache = None
+
+
+class _MemoryCache(object):
+    def __init__(self, maxsize):
+        import collections
+
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+
+    def get_many(self, keys):
+        data = self._data
+        result = {}
+        for key in keys:
+            if key in data:
+                result[key] = data[key]
+                data.move_to_end(key)
+        return result
+
+    def set_many(self, items):
+        data = self._data
+        for key, value in items.items():
+            data[key] = value
+            data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+
+    def invalidate(self, gfyear=None):
+        if gfyear is None:
+            self._data.clear()
+        else:
+            for key in [key for key in self._data if key[1] == gfyear]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _SQLiteCache(object):
+    def __init__(self, path, batch_size):
+        import sqlite3
+
+        self.batch_size = batch_size
+        self._pending = {}
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tktitler_cache '
+                '(key TEXT PRIMARY KEY, gfyear INTEGER, value TEXT)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS tktitler_cache_gfyear '
+                'ON tktitler_cache (gfyear)')
+
+    def get_many(self, keys):
+        import json
+
+        result = {}
+        missing = {}
+        for key in keys:
+            try:
+                result[key] = self._pending[key]
+            except KeyError:
+                missing[json.dumps(key, ensure_ascii=False)] = key
+        names = list(missing)
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            rows = self._conn.execute(
+                'SELECT key, value FROM tktitler_cache WHERE key IN (%s)' %
+                ','.join('?' * len(chunk)), chunk)
+            for name, value in rows:
+                result[missing[name]] = json.loads(value)
+        return result
+
+    def set_many(self, items):
+        self._pending.update(items)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        import json
+
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO tktitler_cache VALUES (?, ?, ?)',
+                [(json.dumps(key, ensure_ascii=False), key[1],
+                  json.dumps(value, ensure_ascii=False))
+                 for key, value in self._pending.items()])
+        self._pending.clear()
+
+    def invalidate(self, gfyear=None):
+        with self._conn:
+            if gfyear is None:
+                self._pending.clear()
+                self._conn.execute('DELETE FROM tktitler_cache')
+            else:
+                self._pending = {key: value
+                                 for key, value in self._pending.items()
+                                 if key[1] != gfyear}
+                self._conn.execute(
+                    'DELETE FROM tktitler_cache WHERE gfyear = ?', (gfyear,))
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def memory_cache(maxsize=65536):
+    """
+    Returner en cache der gemmer resultater i hukommelsen.
+
+    Når cachen er fuld, fjernes det resultat der er brugt for længst tid
+    siden. Se :func:`set_cache`.
+
+    :param int maxsize: det største antal resultater i cachen, eller None
+                        for ingen grænse.
+    """
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("\'%s\' is not a valid maxsize" % maxsize)
+    return _MemoryCache(maxsize)
+
+
+def sqlite_cache(path, batch_size=1000):
+    """
+    Returner en cache der gemmer resultater i en SQLite-database.
+
+    Databasen bruger WAL, så flere processer kan dele den. Nye resultater
+    skrives samlet når der er ``batch_size`` af dem, eller når cachens
+    ``flush`` eller ``close`` bliver kaldt.
+
+    Se :func:`set_cache`.
+
+    :param str path: filen med databasen.
+    :param int batch_size: antal resultater der skrives ad gangen.
+    """
+    return _SQLiteCache(path, batch_size)
+
+
+def set_cache(backend):
+    """
+    Sæt cachen der bruges af :func:`parse`, :func:`prefix` og :func:`email`.
+
+    En cache er et objekt med følgende metoder:
+
+    ``get_many(keys)``
+        Returner en dict med de af nøglerne i ``keys`` der findes i cachen.
+    ``set_many(items)``
+        Gem nøgler og værdier fra dict'en ``items``.
+    ``invalidate(gfyear=None)``
+        Fjern resultater beregnet med det givne gfyear, eller alle
+        resultater hvis gfyear er None.
+
+    Nøglerne er tupler hvor andet element er gfyear, og værdierne kan
+    gemmes som JSON.
+
+    :param backend: cachen, f.eks. fra :func:`memory_cache` eller
+                    :func:`sqlite_cache`, eller None for ingen cache.
+    :returns: den forrige cache.
+
+    :example:
+
+    >>> previous = tk.set_cache(tk.memory_cache())
+    >>> tk.parse('GFORM', 2016)
+    ('FORM', 2015)
+    >>> tk.set_cache(previous)  # doctest: +ELLIPSIS
+    <tktitler._MemoryCache object at ...>
+    """
+    global _cache
+    previous = _cache
+    _cache = backend
+    return previous
+
+
+def _cached(key, fn, *args):
+    found = _cache.get_many([key])
+    try:
+        return found[key]
+    except KeyError:
+        pass
+    value = fn(*args)
+    _cache.set_many({key: value})
+    return value
+
+
 _PREFIXTYPE_NORMAL = "normal"
 _PREFIXTYPE_UNICODE = "unicode"
 _PREFIXTYPE_TEX = "tex"
@@ -145,6 +468,131 @@ def _escape_tex(s):
     return str(s).replace('$', r'\$')
 
 
+def _superscript_normal(n):
+    return n
+
+
+_UNICODE_SUPERSCRIPTS = str.maketrans('0123456789', '⁰¹²³⁴⁵⁶⁷⁸⁹')
+
+
+def _superscript_unicode(n):
+    return str(n).translate(_UNICODE_SUPERSCRIPTS)
+
+
+def _superscript_tex(n):
+    return '$^{%s}$' % (n,)
+
+
+_PREFIX_TYPES = {}
+_POSTFIX_TYPES = {}
+
+
+def register_prefix_type(name, superscript, escape=None):
+    """
+    Tilføj en ny værdi af ``type`` til :func:`prefix` og :func:`kprefix`
+    samt ``prefixtype`` til :func:`prepostfix`.
+
+    :param str name: navnet på typen.
+    :param superscript: funktion der givet en int returnerer den som potens.
+    :param escape: funktion der givet roden returnerer den escapet,
+                   eller None hvis roden ikke skal escapes.
+
+    :example:
+
+    >>> import html
+    >>> tk.register_prefix_type('html', lambda n: '<sup>%s</sup>' % n,
+    ...                         html.escape)
+    >>> tk.prefix(('FORM', 2010), 2016, type='html')
+    'T<sup>3</sup>OFORM'
+    >>> tk.unregister_prefix_type('html')
+    """
+    if name in _PREFIX_TYPES:
+        raise ValueError("\'%s\' is already a registered type" % name)
+    _PREFIX_TYPES[name] = superscript, escape
+
+
+def unregister_prefix_type(name):
+    """
+    Fjern en type der er tilføjet med :func:`register_prefix_type`.
+
+    De indbyggede typer kan ikke fjernes.
+
+    :param str name: navnet på typen.
+    """
+    _unregister_type(_PREFIX_TYPES, name, _BUILTIN_PREFIX_TYPES)
+
+
+def register_postfix_type(name, postfix):
+    """
+    Tilføj en ny værdi af ``type`` til :func:`postfix` samt ``postfixtype``
+    til :func:`prepostfix`.
+
+    :param str name: navnet på typen.
+    :param postfix: funktion der givet en periode og en separator returnerer
+                    postfixet. Separatoren er et mellemrum, undtagen når
+                    roden er tom.
+
+    :example:
+
+    >>> tk.register_postfix_type(
+    ...     'dash', lambda period, space: '%s%s-%s' % (space, period, period+1))
+    >>> tk.postfix(('FORM', 2010), type='dash')
+    'FORM 2010-2011'
+    >>> tk.unregister_postfix_type('dash')
+    """
+    if name in _POSTFIX_TYPES:
+        raise ValueError("\'%s\' is already a registered type" % name)
+    _POSTFIX_TYPES[name] = postfix
+
+
+def unregister_postfix_type(name):
+    """
+    Fjern en type der er tilføjet med :func:`register_postfix_type`.
+
+    De indbyggede typer kan ikke fjernes.
+
+    :param str name: navnet på typen.
+    """
+    _unregister_type(_POSTFIX_TYPES, name, _BUILTIN_POSTFIX_TYPES)
+
+
+def _unregister_type(types, name, builtin):
+    if name in builtin:
+        raise ValueError("\'%s\' is a built-in type" % name)
+    if name not in types:
+        raise ValueError("\'%s\' is not a registered type" % name)
+    del types[name]
+    # Cached results may have been written with the removed type.
+    if _cache is not None:
+        _cache.invalidate()
+
+
+def _prefix_type(type):
+    try:
+        return _PREFIX_TYPES[type]
+    except KeyError:
+        raise ValueError(
+            "\'%s\' is not a valid type-parameter" % type) from None
+
+
+_PREFIXES = ('K', '', 'G', 'B', 'O', 'TO')
+
+
+def _prefix_part(age, sup_fn):
+    if age < -1:
+        return 'K%s' % sup_fn(-age)
+    elif age + 1 < len(_PREFIXES):
+        return _PREFIXES[age + 1]
+    else:
+        return 'T%sO' % sup_fn(age - 3)
+
+
+def _kprefix_part(age, sup_fn):
+    if age < 0:
+        return _prefix_part(age, sup_fn)
+    return 'K' + _prefix_part(age + 1, sup_fn)
+
+
 def prefix(title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
     """
     Givet en titel af (root, period), returner titlen skrevet med prefix.
@@ -180,40 +628,21 @@ def prefix(title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
 
     """
     (root, period), gfyear = _validate(title, gfyear)
+    if _cache is not None:
+        return _cached(('prefix', gfyear, root, period, type),
+                       _prefix, root, period, gfyear, type)
+    return _prefix(root, period, gfyear, type)
 
+
+def _prefix(root, period, gfyear, type):
     root = _funny_substitute(root)
     age = gfyear - period
 
-    if type == _PREFIXTYPE_TEX:
-        root = _escape_tex(root)
-
-    def identity(n):
-        return n
+    sup_fn, escape = _prefix_type(type)
+    if escape is not None:
+        root = escape(root)
 
-    def unicode_superscript(n):
-        digits = '⁰¹²³⁴⁵⁶⁷⁸⁹'
-        return ''.join(digits[int(i)] for i in str(n))
-
-    def tex_superscript(n):
-        return '$^{%s}$' % (n,)
-
-    sup_fn = None
-    if type == _PREFIXTYPE_NORMAL:
-        sup_fn = identity
-    elif type == _PREFIXTYPE_UNICODE:
-        sup_fn = unicode_superscript
-    elif type == _PREFIXTYPE_TEX:
-        sup_fn = tex_superscript
-    else:
-        raise ValueError("\'%s\' is not a valid type-parameter" % type)
-
-    prefixes = ['K', '', 'G', 'B', 'O', 'TO']
-    if age < -1:
-        return 'K%s' % sup_fn(-age) + root
-    elif age + 1 < len(prefixes):
-        return prefixes[age + 1] + root
-    else:
-        return 'T%sO' % sup_fn(age - 3) + root
+    return _prefix_part(age, sup_fn) + root
 
 
 def kprefix(title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
@@ -308,14 +737,7 @@ def postfix(title, *, type=_POSTFIXTYPE_SINGLE):
     """
     root, period = validate_title(title)
 
-    if root == 'EFUIT':
-        logger.warning('Returning an EFUIT postfix. The postfix does not '
-                       'necessarily represent the actual year the given EFUIT '
-                       'was EFUIT.')
-    if period < 1959:
-        logger.warning('Returning a postfix from before 1959. The postfix '
-                       'does not necessarily represent the actual year the '
-                       'given %s was %s.' % (root, root))
+    _warn_postfix(root, period)
 
     root = _funny_substitute(root)
 
@@ -323,23 +745,53 @@ def postfix(title, *, type=_POSTFIXTYPE_SINGLE):
     if root == "":
         space = ""
 
-    postfix = ""
-
-    if type == _POSTFIXTYPE_SINGLE:
-        postfix = str(period)[2:4]
-    elif type == _POSTFIXTYPE_DOUBLE:
-        postfix = str(period)[2:4] + str(period+1)[2:4]
-    elif type == _POSTFIXTYPE_SLASH:
-        postfix = space + str(period)[2:4] + "/" + str(period+1)[2:4]
-    elif type == _POSTFIXTYPE_LONGSLASH:
-        postfix = space + str(period) + "/" + str(period+1)[2:4]
-    else:
-        raise ValueError("\'%s\' is not a valid type-parameter" % type)
+    postfix = _postfix_part(period, type, space)
 
     assert isinstance(root + postfix, str)
     return root + postfix
 
 
+def _warn_postfix(root, period):
+    if root == 'EFUIT':
+        _warning('Returning an EFUIT postfix. The postfix does not '
+                 'necessarily represent the actual year the given EFUIT '
+                 'was EFUIT.')
+    if period < 1959:
+        _warning('Returning a postfix from before 1959. The postfix '
+                 'does not necessarily represent the actual year the '
+                 'given %s was %s.' % (root, root))
+
+
+def _postfix_part(period, type, space):
+    try:
+        postfix = _POSTFIX_TYPES[type]
+    except KeyError:
+        raise ValueError(
+            "\'%s\' is not a valid type-parameter" % type) from None
+    return postfix(period, space)
+
+
+register_prefix_type(_PREFIXTYPE_NORMAL, _superscript_normal)
+register_prefix_type(_PREFIXTYPE_UNICODE, _superscript_unicode)
+register_prefix_type(_PREFIXTYPE_TEX, _superscript_tex, _escape_tex)
+
+register_postfix_type(
+    _POSTFIXTYPE_SINGLE,
+    lambda period, space: str(period)[2:4])
+register_postfix_type(
+    _POSTFIXTYPE_DOUBLE,
+    lambda period, space: str(period)[2:4] + str(period+1)[2:4])
+register_postfix_type(
+    _POSTFIXTYPE_SLASH,
+    lambda period, space: space + str(period)[2:4] + "/" + str(period+1)[2:4])
+register_postfix_type(
+    _POSTFIXTYPE_LONGSLASH,
+    lambda period, space: space + str(period) + "/" + str(period+1)[2:4])
+
+_BUILTIN_PREFIX_TYPES = tuple(_PREFIX_TYPES)
+_BUILTIN_POSTFIX_TYPES = tuple(_POSTFIX_TYPES)
+
+
 def prepostfix(title, gfyear=None, *, prefixtype=_PREFIXTYPE_NORMAL,
                postfixtype=_POSTFIXTYPE_LONGSLASH):
     """
@@ -447,118 +899,723 @@ def email(title, gfyear=None, *, type=_EMAILTYPE_POSTFIX):
 
     """
     (root, period), gfyear = _validate(title, gfyear)
+    # Warn outside the cached part, so that cache hits also warn.
+    if type == _EMAILTYPE_POSTFIX and (root == 'EFUIT' or period < 1959):
+        _warn_email(_email_root(root, period), period)
+    if _cache is not None:
+        return _cached(('email', gfyear, root, period, type),
+                       _email, root, period, gfyear, type)
+    return _email(root, period, gfyear, type)
+
+
+def _email(root, period, gfyear, type):
+    root = _email_root(root, period)
+
+    try:
+        email_fn = _EMAIL_TYPES[type]
+    except KeyError:
+        raise ValueError(
+            "\'%s\' is not a valid type-parameter" % type) from None
+    result = email_fn(root, period, gfyear - period)
+    assert isinstance(result, str)
+    return result
+
+
+_EMAIL_TYPES = {
+    _EMAILTYPE_POSTFIX:
+        lambda root, period, age: root + str(period)[2:4],
+    _EMAILTYPE_PREFIX:
+        lambda root, period, age: (
+            _prefix_part(age, _superscript_normal) + root),
+}
+
+
+def _warn_email(root, period):
+    if root == 'EFUIT':
+        _warning('Returning an EFUIT email with postfix. The postfix '
+                 'does not necessarily represent the actual year the '
+                 'given EFUIT was EFUIT.')
+    if period < 1959:
+        _warning('Returning an email from before 1959 with postfix. The '
+                 'postfix does not necessarily represent the actual '
+                 'year the given %s was %s.' % (root, root))
+
 
+def _email_root(root, period):
     root = _normalize(root)
     try:
-        root = next(email for r, p, email in _SPECIAL_CASES if (r, p) == (root, period))
-    except StopIteration:
+        return _SPECIAL_EMAILS[root, period]
+    except KeyError:
         root = _multireplace(root, DIGRAPHS)
         digraphs_lower = {ch.lower(): di.lower() for ch, di in DIGRAPHS.items()}
-        root = _multireplace(root, digraphs_lower)
-
-    if root == 'EFUIT' and type == _EMAILTYPE_POSTFIX:
-        logger.warning('Returning an EFUIT email with postfix. The postfix '
-                       'does not necessarily represent the actual year the '
-                       'given EFUIT was EFUIT.')
-    if period < 1959 and type == _EMAILTYPE_POSTFIX:
-        logger.warning('Returning an email from before 1959 with postfix. The '
-                       'postfix does not necessarily represent the actual '
-                       'year the given %s was %s.' % (root, root))
-
-    pre = ""
-    post = ""
-    if type == _EMAILTYPE_POSTFIX:
-        post = str(period)[2:4]
-    elif type == _EMAILTYPE_PREFIX:
-        pre = prefix(("", period), gfyear, type=_PREFIXTYPE_NORMAL)
+        return _multireplace(root, digraphs_lower)
+
+
+def aliases(title, gfyear=None):
+    """
+    Givet en titel af (root, period), generer alle måder titlen kan skrives på.
+
+    Det omfatter output fra :func:`prefix`, :func:`kprefix`, :func:`postfix`,
+    :func:`prepostfix` og :func:`email` i alle typer, både med den
+    oprindelige rod, med KA$$ og med ASCII-forlængelser af æ, ø, å og ü.
+    Hvert alias gives kun én gang, og titlen valideres kun én gang.
+
+    :param tuple title: tupel af en str og int, hvor strengen er roden af
+                        titlen og int er perioden.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :rtype: iterator of str
+
+    :example:
+
+    >>> list(tk.aliases(('FUHØ', 2015), 2016))  # doctest: +ELLIPSIS
+    ['GFUHØ', 'GFUHØ 15', 'GFUHØ 1516', 'GFUHØ 15/16', 'GFUHØ 2015/16', ...]
+    >>> 'GKA$$' in tk.aliases(('KASS', 2015), 2016)
+    True
+    """
+    (root, period), gfyear = _validate(title, gfyear)
+    age = gfyear - period
+    email_root = _email_root(root, period)
+
+    sup_fns = (_superscript_normal, _superscript_unicode, _superscript_tex)
+    postfix_types = (_POSTFIXTYPE_SINGLE, _POSTFIXTYPE_DOUBLE,
+                     _POSTFIXTYPE_SLASH, _POSTFIXTYPE_LONGSLASH)
+    prefixes = [_prefix_part(age, f) for f in sup_fns]
+    kprefixes = [_kprefix_part(age, f) for f in sup_fns]
+    postfixes = [_postfix_part(period, t, " ") for t in postfix_types]
+    if root == "EFUIT" or period < 1959:
+        prepostfixes = ['']
     else:
-        raise ValueError("\'%s\' is not a valid type-parameter" % type)
-    assert isinstance(pre + root + post, str)
-    return pre + root + post
+        prepostfixes = [' ' + _postfix_part(period, t, "")
+                        for t in postfix_types]
+
+    def candidates():
+        for r in (root, _funny_substitute(root), email_root):
+            prefix_roots = (r, r, _escape_tex(r))
+            for pre, pre_root in zip(prefixes, prefix_roots):
+                yield pre + pre_root
+                for post in prepostfixes:
+                    yield pre + pre_root + post
+            for pre, pre_root in zip(kprefixes, prefix_roots):
+                yield pre + pre_root
+            for post in postfixes:
+                yield r + post
+
+    seen = set()
+    for alias in candidates():
+        if alias not in seen:
+            seen.add(alias)
+            yield alias
+
+
+def timeline(title, gfyears=None, *, type=_PREFIXTYPE_NORMAL):
+    """
+    Givet en titel af (root, period), returner titlen skrevet med prefix for
+    hvert år i ``gfyears``.
 
+    Titlen valideres kun én gang, og prefixerne findes ved at gå gennem
+    titlens alder år for år i stedet for at kalde :func:`prefix` for hvert år.
 
-def _normalize(input_alias):
-    s = input_alias.upper()
-    s = s.replace(' ', '')
+    :param tuple title: tupel af en str og int, hvor strengen er roden af
+                        titlen og int er perioden.
+    :param gfyears: årene titlen skal skrives for. Som standard alle år fra
+                    perioden til og med gfyear, der skal være sat som en
+                    context. Se :doc:`gfyear`.
+    :param str type: Format af output som i :func:`prefix`.
+
+    :rtype: list of str
+
+    :example:
 
-    replace_dict = {'BEST/FU': 'BESTFU'}
-    s = _multireplace(s, replace_dict)
+    >>> tk.timeline(('FORM', 2010), range(2010, 2017))
+    ['FORM', 'GFORM', 'BFORM', 'OFORM', 'TOFORM', 'T2OFORM', 'T3OFORM']
+    >>> tk.timeline(('KASS', 2015), [2014, 2020], type='unicode')
+    ['KKA$$', 'T²OKA$$']
+    """
+    root, period = validate_title(title)
+    return list(_timeline(root, period, gfyears, type, {}))
 
-    table = {'$': 'S',
-             '\N{POUND SIGN}': 'S',
-             '\N{DOUBLE-STRUCK CAPITAL C}': 'C'}
 
-    def tr(c):
+def _timeline(root, period, gfyears, type, parts):
+    if gfyears is None:
+        gfyears = range(period, get_gfyear(None) + 1)
+    sup_fn, escape = _prefix_type(type)
+    root = _funny_substitute(root)
+    if escape is not None:
+        root = escape(root)
+    result = []
+    for gfyear in gfyears:
+        age = gfyear - period
         try:
-            return table[c]
+            part = parts[age]
         except KeyError:
-            try:
-                return str(unicodedata.digit(c))
-            except ValueError:
-                return c
+            part = parts[age] = _prefix_part(age, sup_fn)
+        result.append(part + root)
+    return result
 
-    letters = ''.join(DIGRAPHS.keys())
-    return re.sub(r'[^0-9A-Z%s]' % letters,
-                  lambda mo: tr(mo.group(0)), s)
 
+def timelines(roster, gfyears=None, *, type=_PREFIXTYPE_NORMAL):
+    """
+    Som :func:`timeline`, men for mange titler.
 
-def _normalize_escaped(alias):
-    # The grammar
-    #     S -> "FU" letter letter
-    #     letter -> ascii | extended
-    #     ascii -> "A" | ... | "Z"
-    #     extended -> "AA" | "AE"
-    # is ambiguous, since "FUAAA" and "FUAAE" have two derivations each:
-    #     "FUAAA" == "FU" + "AA" + "A" == "FU" + "A" + "AA"
-    #     "FUAAE" == "FU" + "AA" + "E" == "FU" + "A" + "AE"
-    # The problem arises whenever 'extended' has two productions where the
-    # first letter in one production is the last letter in another, i.e.
-    #     extended -> c1 c2
-    #     extended -> c2 c3
-    #     ascii -> c1 | c2 | c3
-    # since in that case "FU" c1 c2 c3 is ambiguous: "FU" (c1 c2) c3 or
-    # "FU" c1 (c2 c3).
-    if ("AAA" in alias and "AAAA" not in alias) or "AAE" in alias:
-        raise ValueError("%s is an ambiguous alias. Cannot normalize." % alias)
-    replace_dict = {
-        digraph: character for character, digraph in DIGRAPHS.items()}
-    alias = _multireplace(alias, replace_dict)
-    return alias
+    Resultatet genereres én titel ad gangen, så hele rosteret ikke skal
+    ligge i hukommelsen, og prefixerne genbruges på tværs af titlerne.
 
+    :param roster: titlerne der skal skrives.
+    :param gfyears: årene titlerne skal skrives for. Som standard alle år fra
+                    hver titels periode til og med gfyear.
+    :param str type: Format af output som i :func:`prefix`.
 
-def _parse_prefix(prefix):
-    pattern = r"^(([KGBO]|T[0-9T]*O)[0-9]*)*$"
-    if not re.match(pattern, prefix):
-        raise ValueError(prefix)
-    prefix_value = dict(K=-1, G=1, B=2, O=3, T=1)
-    factors = []
-    for base, exponent in re.findall(r"([KGBOT])([0-9]*)", prefix):
-        factors.append(int(exponent or 1) * prefix_value[base])
-    return sum(factors)
+    :rtype: iterator of (title, list of str)
 
+    :example:
 
-def _parse_postfix(postfix):
-    if not isinstance(postfix, str):
-        raise TypeError(type(postfix))
-    if not postfix:
-        return
+    >>> for title, names in tk.timelines([('FORM', 2015), ('CERM', 2016)],
+    ...                                  range(2015, 2018)):
+    ...     print(title, names)
+    ('FORM', 2015) ['FORM', 'GFORM', 'BFORM']
+    ('CERM', 2016) ['KCERM', 'CERM', 'GCERM']
+    """
+    _prefix_type(type)
+    if gfyears is not None:
+        gfyears = list(gfyears)
+    parts = {}
+    for title in roster:
+        root, period = validate_title(title)
+        yield title, _timeline(root, period, gfyears, type, parts)
 
-    if '/' in postfix:
-        try:
-            first, second = postfix.split('/')
-        except ValueError:
-            raise ValueError(postfix) from None
-        lens = (len(first), len(second))
-        first, second = int(first), int(second)
-        if lens == (2, 2) and (first + 1) % 100 == second:
-            # 12/13; note that 20/21 is not ambiguous.
-            return 2000 + first if first < 56 else 1900 + first
-        elif lens == (4, 4) and first + 1 == second:
+
+class _MailMap(object):
+    def __init__(self, gfyear, aliases, entries, changed, removed):
+        self.gfyear = gfyear
+        self.aliases = aliases
+        self._entries = entries
+        self.changed = changed
+        self.removed = removed
+
+
+def mailmap(roster, gfyear=None, previous=None):
+    """
+    Lav et virtual-alias map fra emailnavne til modtagere.
+
+    Hver titel giver to emailnavne, nemlig output fra :func:`email` med
+    ``type='postfix'`` og ``type='prefix'``. Hvis flere modtagere har samme
+    emailnavn, adskilles modtagerne med komma i sorteret rækkefølge, og
+    hver modtager kommer kun med én gang.
+
+    Hvis ``previous`` er et tidligere resultat af :func:`mailmap`, genbruges
+    emailnavnene for titler der stadig er i ``roster``, og ændringerne i
+    forhold til ``previous`` gives i ``changed`` og ``removed``.
+
+    :param roster: par af (title, destination).
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+    :param previous: et tidligere resultat af :func:`mailmap`.
+
+    :returns: et objekt med attributterne ``aliases`` (dict fra emailnavn til
+              modtager), ``changed`` (dict over nye og ændrede emailnavne) og
+              ``removed`` (set af fjernede emailnavne).
+
+    :example:
+
+    >>> m = tk.mailmap([(('FORM', 2015), 'alice'), (('KASS', 2016), 'bob')],
+    ...                2016)
+    >>> sorted(m.aliases.items())  # doctest: +NORMALIZE_WHITESPACE
+    [('FORM15', 'alice'), ('GFORM', 'alice'),
+     ('KASS', 'bob'), ('KASS16', 'bob')]
+    >>> m = tk.mailmap([(('FORM', 2015), 'alice'), (('KASS', 2016), 'bob')],
+    ...                2017, previous=m)
+    >>> sorted(m.changed.items())
+    [('BFORM', 'alice'), ('GKASS', 'bob')]
+    >>> sorted(m.removed)
+    ['GFORM', 'KASS']
+    """
+    gfyear = get_gfyear(gfyear)
+    if previous is None:
+        prev_entries = {}
+        prev_aliases = {}
+    else:
+        prev_entries = previous._entries
+        prev_aliases = previous.aliases
+
+    entries = {}
+    aliases = {}
+    for title, destination in roster:
+        root, period = validate_title(title)
+        key = (root, period, destination)
+        try:
+            email_root, post = prev_entries[key]
+        except KeyError:
+            email_root = _email_root(root, period)
+            post = email((root, period), gfyear, type=_EMAILTYPE_POSTFIX)
+        entries[key] = email_root, post
+        pre = _prefix_part(gfyear - period, _superscript_normal) + email_root
+        for alias in (post, pre):
+            aliases.setdefault(alias, set()).add(destination)
+
+    # Sorted, so that the result does not depend on the order of roster.
+    aliases = {alias: ', '.join(sorted(destinations))
+               for alias, destinations in aliases.items()}
+    changed = {alias: destination for alias, destination in aliases.items()
+               if prev_aliases.get(alias) != destination}
+    removed = set(prev_aliases).difference(aliases)
+    return _MailMap(gfyear, aliases, entries, changed, removed)
+
+
+class _NormalizeTable(dict):
+    # Translation table for str.translate used by _normalize. Characters
+    # not in the table are looked up with unicodedata.digit on first use
+    # and cached, up to maxsize entries.
+    maxsize = 65536
+
+    def __missing__(self, c):
+        ch = chr(c)
+        try:
+            r = str(unicodedata.digit(ch))
+        except ValueError:
+            r = ch
+        if len(self) < self.maxsize:
+            self[c] = r
+        return r
+
+
+_NORMALIZE_TABLE = _NormalizeTable({
+    ord('$'): 'S',
+    ord('\N{POUND SIGN}'): 'S',
+    ord('\N{DOUBLE-STRUCK CAPITAL C}'): 'C',
+})
+_NORMALIZE_TABLE.update(
+    (ord(c), str(i)) for i, c in enumerate('⁰¹²³⁴⁵⁶⁷⁸⁹'))
+_NORMALIZE_TABLE.update(
+    (ord(c), str(i)) for i, c in enumerate('₀₁₂₃₄₅₆₇₈₉'))
+_NORMALIZE_TABLE.update(
+    (ord(c), c) for c in '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_NORMALIZE_TABLE.update((ord(c), c) for c in DIGRAPHS)
+
+
+_CORPUS_MIX = {'title': 0.85, 'noise': 0.1, 'ambiguous': 0.02, '2021': 0.02,
+               'long': 0.01}
+
+
+def generate_corpus(n, seed=None, mix=None, gfyear=None):
+    """
+    Generer en strøm af tilfældige aliaser til belastningstest.
+
+    Aliaserne genereres én ad gangen, så strømmen kan være vilkårligt lang.
+    Hver streng er en af følgende slags:
+
+    ``title``
+        En tilfældig titel skrevet med :func:`prefix`, :func:`kprefix`,
+        :func:`postfix` eller :func:`email` i en tilfældig type.
+    ``noise``
+        En streng der ikke er en titel, f.eks. et navn eller en emailadresse.
+    ``ambiguous``
+        Et alias som ``FUAAA`` der ikke kan parses entydigt.
+    ``2021``
+        Et alias med det tvetydige postfix 2021.
+    ``long``
+        En lang streng, f.eks. med et meget langt prefix.
+
+    :param int n: antal aliaser, eller None for en uendelig strøm.
+    :param seed: seed til :class:`random.Random`.
+    :param dict mix: vægten af hver slags streng. Vægtene må ikke være
+                     negative, og mindst én skal være positiv.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :rtype: iterator of str
+
+    :example:
+
+    >>> corpus = tk.generate_corpus(5, seed=42, mix={'title': 1}, gfyear=2016)
+    >>> len([tk.parse(alias, 2016) for alias in corpus])
+    5
+    """
+    import random
+
+    gfyear = get_gfyear(gfyear)
+    rng = random.Random(seed)
+    if mix is None:
+        mix = _CORPUS_MIX
+    kinds = sorted(mix)
+    for kind in kinds:
+        if kind not in _CORPUS_MIX:
+            raise ValueError("\'%s\' is not a valid kind" % kind)
+        if not mix[kind] >= 0:
+            raise ValueError("\'%s\' is not a valid weight" % mix[kind])
+    cum_weights = list(itertools.accumulate(mix[kind] for kind in kinds))
+    if not cum_weights or not cum_weights[-1] > 0:
+        raise ValueError("The weights in mix must not all be zero")
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' + ''.join(DIGRAPHS)
+    roots = sorted(_KNOWN_ROOTS - {'EFUIT'})
+    prefix_types = sorted(_BUILTIN_PREFIX_TYPES)
+    postfix_types = sorted(_BUILTIN_POSTFIX_TYPES)
+    email_types = sorted(_EMAIL_TYPES)
+
+    def random_title():
+        if rng.random() < 0.5:
+            root = rng.choice(roots)
+        else:
+            root = 'FU' + rng.choice(letters) + rng.choice(letters)
+        return root, rng.randint(1959, gfyear + 3)
+
+    def random_string(length, chars):
+        return ''.join(rng.choice(chars) for _ in range(length))
+
+    i = 0
+    while n is None or i < n:
+        i += 1
+        kind = kinds[bisect.bisect(cum_weights,
+                                   rng.random() * cum_weights[-1])]
+        if kind == 'title':
+            title = random_title()
+            f = rng.randrange(4)
+            if f == 0:
+                yield prefix(title, gfyear, type=rng.choice(prefix_types))
+            elif f == 1:
+                yield kprefix(title, gfyear, type=rng.choice(prefix_types))
+            elif f == 2:
+                yield postfix(title, type=rng.choice(postfix_types))
+            else:
+                yield email(title, gfyear, type=rng.choice(email_types))
+        elif kind == 'noise':
+            name = random_string(rng.randint(2, 12),
+                                 'abcdefghijklmnopqrstuvwxyz')
+            yield rng.choice([
+                name,
+                name + '.' + random_string(rng.randint(2, 12),
+                                           'abcdefghijklmnopqrstuvwxyz'),
+                name + '@example.com',
+                random_string(rng.randint(1, 30),
+                              'abcdefghijklmnopqrstuvwxyz0123456789.-_+=%!'),
+            ])
+        elif kind == 'ambiguous':
+            yield (rng.choice(['', 'G', 'B', 'T2O']) +
+                   rng.choice(['FUAAA', 'FUAAE', 'EFUAAA']) +
+                   rng.choice(['', '11', '1112', ' 2011/12']))
+        elif kind == '2021':
+            yield rng.choice(roots) + rng.choice(['2021', ' 2021'])
+        else:
+            length = rng.randint(100, 1000)
+            yield rng.choice([
+                'T' * length + 'O' + rng.choice(roots),
+                'KG' * length + rng.choice(roots),
+                random_string(length, letters + '0123456789/$ '),
+            ])
+
+
+class _CompletionIndex(object):
+    def __init__(self, roster, gfyear):
+        self.gfyear = gfyear
+        self._titles = []
+        # Sorted lists of (key, alias, root, period), where key is the
+        # normalized alias. Only the relative entries depend on gfyear.
+        self._absolute = []
+        self._relative = []
+        for title in roster:
+            title = tuple(validate_title(title))
+            self._titles.append(title)
+            self._absolute.extend(self._absolute_entries(title))
+            self._relative.extend(self._relative_entries(title))
+        self._absolute.sort()
+        self._relative.sort()
+
+    @staticmethod
+    def _entries(title, aliases):
+        root, period = title
+        seen = set()
+        for alias in aliases:
+            key = _normalize(alias)
+            if key not in seen:
+                seen.add(key)
+                yield key, alias, root, period
+
+    def _absolute_entries(self, title):
+        root, period = title
+        roots = (_funny_substitute(root), _email_root(root, period))
+        return self._entries(title, [
+            r + _postfix_part(period, type, " ")
+            for type in _BUILTIN_POSTFIX_TYPES for r in roots
+        ])
+
+    def _relative_entries(self, title):
+        root, period = title
+        pre = _prefix_part(self.gfyear - period, _superscript_normal)
+        return self._entries(title, [
+            pre + _funny_substitute(root),
+            pre + _email_root(root, period),
+        ])
+
+    def add(self, title):
+        title = tuple(validate_title(title))
+        self._titles.append(title)
+        for entry in self._absolute_entries(title):
+            bisect.insort(self._absolute, entry)
+        for entry in self._relative_entries(title):
+            bisect.insort(self._relative, entry)
+
+    def remove(self, title):
+        title = tuple(validate_title(title))
+        self._titles.remove(title)
+        for entries, new in ((self._absolute, self._absolute_entries(title)),
+                             (self._relative, self._relative_entries(title))):
+            for entry in new:
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def set_gfyear(self, gfyear):
+        self.gfyear = get_gfyear(gfyear)
+        self._relative = sorted(
+            entry for title in self._titles
+            for entry in self._relative_entries(title))
+
+    def complete(self, partial, k=10):
+        key = _normalize(partial)
+        candidates = []
+        for entries in (self._absolute, self._relative):
+            i = bisect.bisect_left(entries, (key,))
+            found = 0
+            while found < k and i < len(entries):
+                entry = entries[i]
+                if not entry[0].startswith(key):
+                    break
+                candidates.append(entry)
+                found += 1
+                i += 1
+        return [(alias, (root, period)) for _, alias, root, period
+                in heapq.nsmallest(k, candidates)]
+
+    def __len__(self):
+        return len(self._titles)
+
+
+def completion_index(roster, gfyear=None):
+    """
+    Lav et indeks til at foreslå titler ud fra begyndelsen af et alias.
+
+    Indekset indeholder hver titel skrevet med :func:`prefix`,
+    :func:`postfix` i de indbyggede postfixtyper og :func:`email` i begge
+    typer.
+    Det returnerede objekt har følgende metoder:
+
+    ``complete(partial, k=10)``
+        Returner op til ``k`` par af (alias, title) hvor aliaset starter
+        med ``partial``, sorteret efter det normaliserede alias.
+        ``partial`` normaliseres som i :func:`parse`.
+    ``add(title)`` og ``remove(title)``
+        Tilføj eller fjern en titel.
+    ``set_gfyear(gfyear)``
+        Skift gfyear. Kun aliaser med prefix bliver beregnet igen.
+
+    :param roster: titlerne der skal være i indekset.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :example:
+
+    >>> index = tk.completion_index([('FORM', 2015), ('FUHØ', 2015),
+    ...                              ('FUAN', 2010)], 2016)
+    >>> index.complete('gfu')
+    [('GFUHOE', ('FUHØ', 2015)), ('GFUHØ', ('FUHØ', 2015))]
+    >>> index.complete('fu', k=3)
+    [('FUAN10', ('FUAN', 2010)), ('FUAN 10/11', ('FUAN', 2010)), ('FUAN1011', ('FUAN', 2010))]
+    >>> index.complete('FORM 2015')
+    [('FORM 2015/16', ('FORM', 2015))]
+    """
+    return _CompletionIndex(roster, get_gfyear(gfyear))
+
+
+def _normalize(input_alias):
+    s = input_alias.upper()
+    s = s.replace(' ', '')
+    s = s.replace('BEST/FU', 'BESTFU')
+    try:
+        s.encode('ascii')
+    except UnicodeEncodeError:
+        return s.translate(_NORMALIZE_TABLE)
+    # The only ASCII character that is not kept as-is is the dollar sign.
+    return s.replace('$', 'S')
+
+
+_RENDER_FORMATS = ('prefix', 'prefix:unicode', 'prefix:tex', 'postfix',
+                   'prepostfix', 'email')
+
+
+def render(title, gfyear=None, formats=_RENDER_FORMATS):
+    """
+    Givet en titel af (root, period), returner titlen skrevet i flere formater.
+
+    Svarer til at kalde de enkelte funktioner hver for sig, men titlen
+    valideres kun én gang, og mellemresultater deles mellem formaterne.
+
+    :param tuple title: tupel af en str og int, hvor strengen er roden af
+                        titlen og int er perioden.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+    :param formats: navne på formater. Et format er navnet på en af
+                    funktionerne :func:`prefix`, :func:`kprefix`,
+                    :func:`postfix`, :func:`prepostfix` og :func:`email`,
+                    eventuelt efterfulgt af ``:`` og funktionens type,
+                    f.eks. ``prefix:unicode`` eller ``postfix:slash``.
+                    For :func:`prepostfix` angives prefixtype og postfixtype,
+                    f.eks. ``prepostfix:tex:single``.
+                    Som standard bruges ``prefix``, ``prefix:unicode``,
+                    ``prefix:tex``, ``postfix``, ``prepostfix`` og ``email``.
+
+    :rtype: dict
+
+    :example:
+
+    >>> r = tk.render(('KASS', 2011), 2016)
+    >>> r['prefix'], r['prefix:unicode'], r['prefix:tex']
+    ('T2OKA$$', 'T²OKA$$', 'T$^{2}$OKA\\\\$\\\\$')
+    >>> r['postfix'], r['prepostfix'], r['email']
+    ('KA$$11', 'T2OKA$$ 2011/12', 'KASS11')
+    >>> tk.render(('FUHØ', 2010), 2016, ['email:prefix', 'postfix:slash'])
+    {'email:prefix': 'T3OFUHOE', 'postfix:slash': 'FUHØ 10/11'}
+    """
+    (root, period), gfyear = _validate(title, gfyear)
+    age = gfyear - period
+    funny_root = _funny_substitute(root)
+    email_root = None
+    escaped_roots = {}
+    result = {}
+    for f in formats:
+        name, *types = f.split(':')
+        if name in ('prefix', 'kprefix', 'prepostfix'):
+            type = types[0] if types else _PREFIXTYPE_NORMAL
+            sup_fn, escape = _prefix_type(type)
+            if escape is None:
+                r = funny_root
+            else:
+                try:
+                    r = escaped_roots[type]
+                except KeyError:
+                    r = escaped_roots[type] = escape(funny_root)
+            if name == 'kprefix':
+                result[f] = _kprefix_part(age, sup_fn) + r
+            else:
+                result[f] = _prefix_part(age, sup_fn) + r
+            if (name == 'prepostfix' and
+                    not (root == "EFUIT" or period < 1959)):
+                type = (types[1] if len(types) > 1
+                        else _POSTFIXTYPE_LONGSLASH)
+                result[f] += ' ' + _postfix_part(period, type, "")
+        elif name == 'postfix':
+            type = types[0] if types else _POSTFIXTYPE_SINGLE
+            space = " " if funny_root else ""
+            result[f] = funny_root + _postfix_part(period, type, space)
+            _warn_postfix(root, period)
+        elif name == 'email':
+            type = types[0] if types else _EMAILTYPE_POSTFIX
+            if email_root is None:
+                email_root = _email_root(root, period)
+            try:
+                email_fn = _EMAIL_TYPES[type]
+            except KeyError:
+                raise ValueError(
+                    "\'%s\' is not a valid type-parameter" % type) from None
+            if type == _EMAILTYPE_POSTFIX:
+                _warn_email(email_root, period)
+            result[f] = email_fn(email_root, period, age)
+        else:
+            raise ValueError("\'%s\' is not a valid format" % f)
+    return result
+
+
+def _is_ambiguous(alias):
+    return ("AAA" in alias and "AAAA" not in alias) or "AAE" in alias
+
+
+def _normalize_escaped(alias):
+    # The grammar
+    #     S -> "FU" letter letter
+    #     letter -> ascii | extended
+    #     ascii -> "A" | ... | "Z"
+    #     extended -> "AA" | "AE"
+    # is ambiguous, since "FUAAA" and "FUAAE" have two derivations each:
+    #     "FUAAA" == "FU" + "AA" + "A" == "FU" + "A" + "AA"
+    #     "FUAAE" == "FU" + "AA" + "E" == "FU" + "A" + "AE"
+    # The problem arises whenever 'extended' has two productions where the
+    # first letter in one production is the last letter in another, i.e.
+    #     extended -> c1 c2
+    #     extended -> c2 c3
+    #     ascii -> c1 | c2 | c3
+    # since in that case "FU" c1 c2 c3 is ambiguous: "FU" (c1 c2) c3 or
+    # "FU" c1 (c2 c3).
+    if _is_ambiguous(alias):
+        raise ValueError("%s is an ambiguous alias. Cannot normalize." % alias)
+    replace_dict = {
+        digraph: character for character, digraph in DIGRAPHS.items()}
+    alias = _multireplace(alias, replace_dict)
+    return alias
+
+
+# Longer exponents are rejected instead of passed to int(), which refuses
+# strings of more than 4300 digits on Python 3.11+.
+_MAX_EXPONENT_DIGITS = 100
+
+
+def _parse_prefix(prefix):
+    pattern = r"^(([KGBO]|T[0-9T]*O)[0-9]*)*$"
+    if not re.match(pattern, prefix):
+        raise ValueError(prefix)
+    prefix_value = dict(K=-1, G=1, B=2, O=3, T=1)
+    factors = []
+    for base, exponent in re.findall(r"([KGBOT])([0-9]*)", prefix):
+        if len(exponent) > _MAX_EXPONENT_DIGITS:
+            raise ValueError(prefix)
+        factors.append(int(exponent or 1) * prefix_value[base])
+    return sum(factors)
+
+
+_INVALID_POSTFIX = object()
+_DIGITS = re.compile(r'[0-9]+\Z')
+
+
+def _parse_postfix(postfix):
+    if not isinstance(postfix, str):
+        raise TypeError(type(postfix))
+    year = _postfix_year(postfix)
+    if year is _INVALID_POSTFIX:
+        raise ValueError(postfix)
+    if postfix == '2021':
+        _warn_2021()
+    return year
+
+
+def _warn_2021():
+    _warning('While parsing an alias, the technically ambiguous '
+             'postfix 2021 was met. It it assumed it means '
+             '2020/2021.')
+
+
+def _postfix_year(postfix):
+    # Like _parse_postfix, but returns _INVALID_POSTFIX instead of raising
+    # and does not log.
+    if not postfix:
+        return
+
+    if '/' in postfix:
+        parts = postfix.split('/')
+        if len(parts) != 2 or not all(map(_DIGITS.match, parts)):
+            return _INVALID_POSTFIX
+        first, second = parts
+        lens = (len(first), len(second))
+        first, second = int(first), int(second)
+        if lens == (2, 2) and (first + 1) % 100 == second:
+            # 12/13; note that 20/21 is not ambiguous.
+            return 2000 + first if first < 56 else 1900 + first
+        elif lens == (4, 4) and first + 1 == second:
             # 2012/2013
             return first
         elif lens == (4, 2) and (first + 1) % 100 == second:
             # 2012/13
             return first
+    elif not _DIGITS.match(postfix):
+        return _INVALID_POSTFIX
     elif len(postfix) == 2:
         v = int(postfix)
         return 2000 + v if v < 56 else 1900 + v
@@ -573,9 +1630,6 @@ def _parse_postfix(postfix):
             # whereas POSTFIXTYPE_DOUBLE is used in 1/3 of the cases in
             # which as postfix is given (with the remainder using
             # POSTFIXTYPE_SINGLE).
-            logger.warning('While parsing an alias, the technically ambiguous '
-                           'postfix 2021 was met. It it assumed it means '
-                           '2020/2021.')
             return 2020
         if (first + 1) % 100 == second:
             # There should be exactly one year between the two numbers
@@ -583,37 +1637,158 @@ def _parse_postfix(postfix):
         elif first in (19, 20):
             # 19xx or 20xx
             return int(postfix)
-    raise ValueError(postfix)
+    return _INVALID_POSTFIX
 
 
-def _parse_relative(input_alias):
+def add_known_root(root):
+    """
+    Tilføj en rod som :func:`parse` skal genkende.
+
+    Ukendte rødder kan også parses, men kendte rødder parses hurtigere,
+    og et prefix eller postfix bliver altid skilt fra en kendt rod.
+
+    :param str root: roden skrevet med store bogstaver, f.eks. ``FUCK``.
+
+    :example:
+
+    >>> tk.add_known_root('REVY')
+    >>> tk.parse('OREVY', 2016)
+    ('REVY', 2013)
+    >>> tk.remove_known_root('REVY')
+    """
+    global _alias_patterns
+    if not isinstance(root, str) or not _KNOWN_ROOT_RE.match(root):
+        raise ValueError("%r is not a valid root" % (root,))
+    if root not in _KNOWN_ROOTS:
+        _KNOWN_ROOTS.add(root)
+        root_registry.clear_rejected()
+        root_registry.intern(root)
+        _alias_patterns = None
+        if _cache is not None:
+            _cache.invalidate()
+
+
+def remove_known_root(root):
+    """
+    Fjern en rod der er tilføjet med :func:`add_known_root`.
+
+    De indbyggede rødder kan ikke fjernes.
+
+    :param str root: roden skrevet med store bogstaver.
+    """
+    global _alias_patterns
+    if root in _BUILTIN_KNOWN_ROOTS:
+        raise ValueError("%r is a built-in root" % (root,))
+    if root not in _KNOWN_ROOTS:
+        raise ValueError("%r is not a known root" % (root,))
+    _KNOWN_ROOTS.remove(root)
+    _alias_patterns = None
+    if _cache is not None:
+        _cache.invalidate()
+
+
+def known_roots():
+    """
+    Returner mængden af rødder som :func:`parse` genkender.
+
+    Ud over disse genkendes alle rødder der består af FU eller EFU
+    efterfulgt af to bogstaver.
+
+    :rtype: frozenset
+    """
+    return frozenset(_KNOWN_ROOTS)
+
+
+_KNOWN_ROOT_RE = re.compile(r'[A-Z%s]+\Z' % ''.join(DIGRAPHS.keys()))
+
+
+def _trie_pattern(words):
+    # Compile a set of strings into a regular expression that matches
+    # exactly those strings, sharing common prefixes so that the regex
+    # engine does not have to try every alternative in turn.
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[''] = {}
+
+    def subpattern(node):
+        end = '' in node
+        branches = [re.escape(c) + subpattern(node[c])
+                    for c in sorted(node) if c != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        pattern = '(?:%s)' % '|'.join(branches)
+        if end:
+            pattern += '?'
+        return pattern
+
+    return subpattern(trie)
+
+
+_alias_patterns = None
+_min_root_length = None
+
+
+def _get_alias_patterns():
+    global _alias_patterns, _min_root_length
+    if _alias_patterns is None:
+        prefix = r"(?P<pre>((([KGBO]|T[0-9T]*O)[0-9]*)*))"
+        postfix = r"(?P<post>([0-9/])*)"
+        letter = '[A-Z%s]' % ''.join(DIGRAPHS.keys())
+        digraphs = '(?:%s)' % '|'.join(DIGRAPHS.values())
+        known_escaped = ('E?FU(%(l)s{2}|%(l)s[A-Z]|[A-Z]%(l)s)' %
+                         dict(l=digraphs))
+        known = ('E?FU(?:%s){2}|' % letter + _trie_pattern(_KNOWN_ROOTS))
+        # Any root, including one with newlines, so that any_re matches
+        # every string.
+        any_root = r'[\s\S]*?'
+        _alias_patterns = tuple(
+            re.compile('^%s(?P<root>%s)%s$' % (prefix, root, postfix))
+            for root in (known_escaped, known, any_root))
+        # The shortest string that known_re can match, used by
+        # is_title_alias() to reject short strings without a regex.
+        _min_root_length = min([len('FUAA')] + [len(r) for r in _KNOWN_ROOTS])
+    return _alias_patterns
+
+
+def warm():
+    """
+    Udfør den initialisering som ellers sker første gang der parses.
+
+    For at gøre ``import tktitler`` hurtig bliver regulære udtryk og
+    lignende først lavet når de skal bruges. En server der hellere vil
+    betale den pris med det samme kan kalde :func:`warm` ved opstart.
+
+    :example:
+
+    >>> tk.warm()
+    """
+    _get_logger()
+    _get_alias_patterns()
+    _parse_relative('T2OKA$$ 2012/13')
+
+
+def _match_alias(input_alias):
     alias = _normalize(input_alias)
-    prefix = r"(?P<pre>((([KGBO]|T[0-9T]*O)[0-9]*)*))"
-    postfix = r"(?P<post>([0-9/])*)"
-    letter = '[A-Z%s]' % ''.join(DIGRAPHS.keys())
-    digraphs = '(?:%s)' % '|'.join(DIGRAPHS.values())
-    known_escaped = 'E?FU(%(l)s{2}|%(l)s[A-Z]|[A-Z]%(l)s)' % dict(l=digraphs)
-    known = ('CERM|FORM|INKA|KASS|NF|PR|SEKR|VC|' +
-             'E?FU(?:%s){2}|' % letter +
-             'BEST|FU|BESTFU')
-    known_escaped_pattern = '^%s(?P<root>%s)%s$' % (prefix, known_escaped,
-                                                    postfix)
-    known_pattern = '^%s(?P<root>%s)%s$' % (prefix, known, postfix)
-    any_pattern = '^%s(?P<root>.*?)%s$' % (prefix, postfix)
-
-    pre = root = post = ''
-
-    mo = re.match(known_escaped_pattern, alias)
+    known_escaped_re, known_re, any_re = _get_alias_patterns()
+
+    mo = known_escaped_re.match(alias)
     if mo is not None:
-        pre, root, post = mo.group('pre', 'root', 'post')
         needs_unescape = True
     else:
-        mo = re.match(known_pattern, alias) or re.match(any_pattern, alias)
+        mo = known_re.match(alias) or any_re.match(alias)
         assert mo is not None
-        pre, root, post = mo.group('pre', 'root', 'post')
-        assert alias == pre + root + post
         needs_unescape = False
+    return alias, mo, needs_unescape
+
 
+def _parse_relative(input_alias):
+    alias, mo, needs_unescape = _match_alias(input_alias)
+    pre, root, post = mo.group('pre', 'root', 'post')
     age = _parse_prefix(pre)
     gfyear = _parse_postfix(post)
     return age, root, gfyear, needs_unescape
@@ -658,25 +1833,395 @@ def parse(alias, gfyear=None):
     >>> tk.parse("FUAEU", 2022)
     ('FUÆU', 2022)
     '''
+    if _cache is not None:
+        r, error = _check_gfyear(gfyear)
+        root, period = _cached_parse(('parse', None if error else r, alias),
+                                     _parse, alias, gfyear)
+        return root_registry.intern(root), period
+    return _parse(alias, gfyear)
+
+
+def _cached_parse(key, fn, alias, *args):
+    # Like _cached, but a cache hit skips _parse_postfix, so the warning
+    # about the postfix 2021 is logged here instead.
+    missed = []
+
+    def compute():
+        missed.append(True)
+        return fn(alias, *args)
+
+    value = _cached(key, compute)
+    if not missed and _normalize(alias).endswith(('2021', '2021\n')):
+        if _match_alias(alias)[1].group('post') == '2021':
+            _warn_2021()
+    return value
+
+
+def _parse(alias, gfyear):
     age, root, postfix, needs_unescape = _parse_relative(alias)
-    gfyear = postfix or get_gfyear(gfyear)
-    period = gfyear - age
+    return _resolve(root, age, postfix, needs_unescape, gfyear)
+
+
+def _resolve(root, age, postfix, needs_unescape, gfyear):
+    period = (postfix or get_gfyear(gfyear)) - age
     if needs_unescape:
-        try:
-            root = next(
-                normalized
-                for normalized, p, e in _SPECIAL_CASES
-                if (e, p) == (root, period)
-            )
-        except StopIteration:
+        root = _unescape_root(root, period)[0]
+    return root_registry.intern(root), period
+
+
+class _RelativeTitle(object):
+    __slots__ = ('root', 'age', 'postfix_year', 'needs_unescape')
+
+    def __init__(self, root, age, postfix_year, needs_unescape):
+        self.root = root
+        self.age = age
+        self.postfix_year = postfix_year
+        self.needs_unescape = needs_unescape
+
+    def resolve(self, gfyear=None):
+        return _resolve(self.root, self.age, self.postfix_year,
+                        self.needs_unescape, gfyear)
+
+    def __eq__(self, other):
+        if not isinstance(other, _RelativeTitle):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k)
+                   for k in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, k) for k in self.__slots__))
+
+    def __repr__(self):
+        return '<RelativeTitle %s>' % ' '.join(
+            '%s=%r' % (k, getattr(self, k)) for k in self.__slots__)
+
+
+def parse_relative(alias):
+    """
+    Parse et alias uden at kende gfyear.
+
+    Resultatet afhænger kun af aliaset og kan derfor genbruges på tværs af
+    gfyears. Titlen findes med ``resolve(gfyear=None)``, der returnerer det
+    samme som ``parse(alias, gfyear)``. Særtilfælde af rødder slås først op
+    når titlen findes.
+
+    Hvis en cache er sat med :func:`set_cache`, bliver resultatet gemt
+    i cachen uafhængigt af gfyear.
+
+    :param str alias:
+
+    :returns: et objekt med attributterne ``root``, ``age``,
+              ``postfix_year`` og ``needs_unescape``.
+
+    :example:
+
+    >>> r = tk.parse_relative('GFUOEP')
+    >>> r.root, r.age, r.postfix_year, r.needs_unescape
+    ('FUOEP', 1, None, True)
+    >>> r.resolve(2016), r.resolve(2017)
+    (('FUØP', 2015), ('FUØP', 2016))
+    """
+    if _cache is not None:
+        age, root, postfix, needs_unescape = _cached_parse(
+            ('relative', None, alias), _parse_relative, alias)
+    else:
+        age, root, postfix, needs_unescape = _parse_relative(alias)
+    return _RelativeTitle(root_registry.intern(root), age, postfix,
+                          needs_unescape)
+
+
+class _Roster(object):
+    def __init__(self, members, cache_size):
+        self._titles = {}
+        self._by_title = {}
+        self._by_root = {}
+        self._by_period = {}
+        self._parse = functools.lru_cache(maxsize=cache_size)(parse_relative)
+        for member_id, title in members:
+            self.add(member_id, title)
+
+    @staticmethod
+    def _index_add(index, key, member_id):
+        index.setdefault(key, {})[member_id] = None
+
+    @staticmethod
+    def _index_remove(index, key, member_id):
+        members = index[key]
+        del members[member_id]
+        if not members:
+            del index[key]
+
+    def add(self, member_id, title):
+        root, period = validate_title(title)
+        if member_id in self._titles:
+            self.remove(member_id)
+        self._titles[member_id] = root, period
+        self._index_add(self._by_title, (root, period), member_id)
+        self._index_add(self._by_root, root, member_id)
+        self._index_add(self._by_period, period, member_id)
+
+    def remove(self, member_id):
+        root, period = self._titles.pop(member_id)
+        self._index_remove(self._by_title, (root, period), member_id)
+        self._index_remove(self._by_root, root, member_id)
+        self._index_remove(self._by_period, period, member_id)
+
+    def title(self, member_id):
+        return self._titles[member_id]
+
+    def by_title(self, title):
+        return list(self._by_title.get(tuple(title), ()))
+
+    def by_root(self, root):
+        return list(self._by_root.get(root, ()))
+
+    def by_period(self, period):
+        return list(self._by_period.get(period, ()))
+
+    def lookup(self, alias, gfyear=None):
+        return self.by_title(self._parse(alias).resolve(gfyear))
+
+    def lookup_many(self, aliases, gfyear=None):
+        gfyear = get_gfyear(gfyear)
+        return [self.by_title(self._parse(alias).resolve(gfyear))
+                for alias in aliases]
+
+    def __contains__(self, member_id):
+        return member_id in self._titles
+
+    def __iter__(self):
+        return iter(list(self._titles.items()))
+
+    def __len__(self):
+        return len(self._titles)
+
+
+def roster(members=(), cache_size=65536):
+    """
+    Lav et indeks over medlemmer og deres titler.
+
+    Indekset slår medlemmer op ud fra titel, rod og periode i konstant tid,
+    og aliaser parses med :func:`parse_relative` gennem en LRU-cache med
+    plads til ``cache_size`` aliaser. Det returnerede objekt har følgende
+    metoder:
+
+    ``add(member_id, title)``
+        Tilføj et medlem. Hvis medlemmet findes i forvejen, erstattes titlen.
+    ``remove(member_id)``
+        Fjern et medlem. Raiser KeyError hvis medlemmet ikke findes.
+    ``title(member_id)``
+        Returner medlemmets titel.
+    ``by_title(title)``, ``by_root(root)`` og ``by_period(period)``
+        Returner en liste af medlemmer med den givne titel, rod eller periode.
+    ``lookup(alias, gfyear=None)``
+        Returner en liste af medlemmer med titlen som aliaset står for.
+    ``lookup_many(aliases, gfyear=None)``
+        Som ``lookup`` for hvert alias.
+
+    :param members: par af (member_id, title).
+    :param int cache_size: antal aliaser der gemmes parse-resultater for.
+
+    :example:
+
+    >>> r = tk.roster([('alice', ('FORM', 2015)), ('bob', ('FUHØ', 2015))])
+    >>> r.lookup('GFORM', 2016), r.lookup('FUHOE15')
+    (['alice'], ['bob'])
+    >>> r.add('carol', ('FORM', 2015))
+    >>> r.lookup_many(['GFORM', 'BFORM'], 2016)
+    [['alice', 'carol'], []]
+    >>> sorted(r.by_period(2015))
+    ['alice', 'bob', 'carol']
+    """
+    return _Roster(members, cache_size)
+
+
+def _unescape_root(root, period):
+    try:
+        return _SPECIAL_ROOTS[root, period], True
+    except KeyError:
+        return _normalize_escaped(root), False
+
+
+# Matches an ASCII character that cannot occur in a title alias.
+_NON_ALIAS_ASCII = re.compile('[%s]' % re.escape(''.join(
+    c for c in map(chr, range(128)) if not re.match('[0-9A-Za-z $/]', c))))
+
+
+def is_title_alias(s, strict=True):
+    """
+    Afgør hurtigt om en streng er et alias for en titel.
+
+    Med ``strict=True`` godtages kun aliaser hvor roden er kendt
+    (se :func:`known_roots`). Med ``strict=False`` godtages alle strenge
+    som :func:`parse` kan parse. Et alias uden postfix godtages uanset
+    gfyear.
+
+    :param str s: strengen der skal undersøges.
+    :param bool strict: om roden skal være kendt.
+
+    :rtype: bool
+
+    :example:
+
+    >>> tk.is_title_alias('T2OKA$$')
+    True
+    >>> tk.is_title_alias('FUHOE 2011/12')
+    True
+    >>> tk.is_title_alias('john.doe')
+    False
+    >>> tk.is_title_alias('FUAAA11')
+    False
+    >>> tk.is_title_alias('ABEN'), tk.is_title_alias('ABEN', strict=False)
+    (False, True)
+    """
+    if not isinstance(s, str):
+        return False
+    if strict:
+        known_escaped_re, known_re, any_re = _get_alias_patterns()
+        # The alias patterns end in $, which also matches before a final
+        # newline, so parse() accepts e.g. 'FORM\n'. Accept it here too.
+        rest = s.rstrip(' ')
+        if rest[-1:] == '\n':
+            rest = rest[:-1]
+        if len(rest) < _min_root_length or _NON_ALIAS_ASCII.search(rest):
+            return False
+        alias = _normalize(s)
+        mo = known_escaped_re.match(alias)
+        needs_unescape = mo is not None
+        if mo is None:
+            mo = known_re.match(alias)
+            if mo is None:
+                return False
+    else:
+        alias, mo, needs_unescape = _match_alias(s)
+    if _postfix_year(mo.group('post')) is _INVALID_POSTFIX:
+        return False
+    if needs_unescape and _is_ambiguous(mo.group('root')):
+        return mo.group('root') in _SPECIAL_EMAIL_NAMES
+    return True
+
+
+def try_parse(alias, gfyear=None):
+    """
+    Som :func:`parse`, men returner en fejlkode i stedet for at raise en
+    exception.
+
+    :param str alias:
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :returns: en tupel af ((root, period), None) hvis aliaset kan parses, og
+              ellers (None, fejlkode) hvor fejlkoden er en af
+              ``alias-type``, ``prefix``, ``postfix``, ``ambiguous``,
+              ``gfyear-unset``, ``gfyear-type`` og ``gfyear``.
+
+    :example:
+
+    >>> tk.try_parse('GFUOEP17', 2015)
+    (('FUØP', 2016), None)
+    >>> tk.try_parse('FORM1113', 2015)
+    (None, 'postfix')
+    >>> tk.try_parse('FUAAA11')
+    (None, 'ambiguous')
+    """
+    if not isinstance(alias, str):
+        return None, 'alias-type'
+    alias, mo, needs_unescape = _match_alias(alias)
+    pre, root, post = mo.group('pre', 'root', 'post')
+    try:
+        age = _parse_prefix(pre)
+    except ValueError:
+        return None, 'prefix'
+    postfix = _postfix_year(post)
+    if postfix is _INVALID_POSTFIX:
+        return None, 'postfix'
+    if postfix is None:
+        postfix, error = _check_gfyear(gfyear)
+        if error is not None:
+            return None, error
+    elif post == '2021':
+        _warn_2021()
+    period = postfix - age
+    if needs_unescape:
+        special = _SPECIAL_ROOTS.get((root, period))
+        if special is not None:
+            root = special
+        elif _is_ambiguous(root):
+            return None, 'ambiguous'
+        else:
             root = _normalize_escaped(root)
-    return root, period
+    return (root_registry.intern(root), period), None
+
+
+class _ParseResult(object):
+    __slots__ = ('alias', 'prefix_span', 'root_span', 'postfix_span', 'age',
+                 'postfix_year', 'unescaped', 'special_case', 'title')
+
+    def __init__(self, **kwargs):
+        for k in self.__slots__:
+            setattr(self, k, kwargs[k])
+
+    def __repr__(self):
+        return '<ParseResult %s>' % ' '.join(
+            '%s=%r' % (k, getattr(self, k)) for k in self.__slots__)
+
+
+def parse_detailed(alias, gfyear=None):
+    """
+    Som :func:`parse`, men returner alle mellemresultater fra parsingen.
+
+    :param str alias:
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :returns: et objekt med følgende attributter:
+
+              ``alias``
+                  Det normaliserede alias.
+              ``prefix_span``, ``root_span``, ``postfix_span``
+                  Start og slut af prefix, rod og postfix i ``alias``.
+              ``age``
+                  Antal år titlen er ældre end postfixet eller gfyear.
+              ``postfix_year``
+                  Året angivet af postfixet, eller None.
+              ``unescaped``
+                  Om ASCII-forlængelser i roden er blevet erstattet.
+              ``special_case``
+                  Om roden er fundet som et særtilfælde.
+              ``title``
+                  Tuplen af (root, period) som :func:`parse` returnerer.
+
+    :example:
+
+    >>> r = tk.parse_detailed('gfuoep 17', 2015)
+    >>> r.alias, r.root_span, r.age, r.postfix_year, r.unescaped
+    ('GFUOEP17', (1, 6), 1, 2017, True)
+    >>> r.title
+    ('FUØP', 2016)
+    """
+    normalized, mo, needs_unescape = _match_alias(alias)
+    pre, root, post = mo.group('pre', 'root', 'post')
+    age = _parse_prefix(pre)
+    postfix = _parse_postfix(post)
+    period = (postfix or get_gfyear(gfyear)) - age
+    special_case = False
+    if needs_unescape:
+        root, special_case = _unescape_root(root, period)
+    return _ParseResult(
+        alias=normalized, prefix_span=mo.span('pre'),
+        root_span=mo.span('root'), postfix_span=mo.span('post'), age=age,
+        postfix_year=postfix, unescaped=needs_unescape,
+        special_case=special_case,
+        title=(root_registry.intern(root), period))
 
 
 def validate_title(title):
     """
     Givet en titel af (root, period), validerer om det er en gyldig titel. Kan raise ValueError.
 
+    Returnerer altid en tupel af (root, period), også hvis titlen er givet
+    som f.eks. en liste.
+
     :param tuple title: tupel af en str og int, hvor strengen er roden af
                         titlen og int er perioden.
     :rtype: tuple
@@ -685,6 +2230,8 @@ def validate_title(title):
 
     >>> tk.validate_title(('KASS', 2011))
     ('KASS', 2011)
+    >>> tk.validate_title(['KASS', 2011])
+    ('KASS', 2011)
 
     >>> tk.validate_title((0, 2011))
     Traceback (most recent call last):
@@ -704,22 +2251,313 @@ def validate_title(title):
     if isinstance(title, _TitleABC):
         title = title.title_tuple()
     root, period = title
-    if not isinstance(root, str):
+    error = _title_error(root, period)
+    if error == 'root-type':
         raise ValueError(
             "%s is not a valid type for root." % type(root).__name__)
-    if not isinstance(period, int):
+    elif error == 'period-type':
         raise ValueError(
             "%s is not a valid type for period." % type(period).__name__)
-    if not len(str(period)) == 4:
+    elif error == 'period':
         raise ValueError("\'%s\' is not a valid period" % period)
+    interned = root_registry.intern(root)
+    if interned is not root or type(title) is not tuple:
+        title = (interned, period)
     return title
 
 
+def _title_error(root, period):
+    if not isinstance(root, str):
+        return 'root-type'
+    if not isinstance(period, int):
+        return 'period-type'
+    if not (1000 <= period <= 9999 or _has_four_digits(period)):
+        return 'period'
+
+
 def _validate(title, gfyear):
     title = validate_title(title)
     return title, get_gfyear(gfyear)
 
 
+def try_validate(title):
+    """
+    Som :func:`validate_title`, men returner en fejlkode i stedet for at
+    raise en exception.
+
+    :param tuple title: tupel af en str og int, hvor strengen er roden af
+                        titlen og int er perioden.
+
+    :returns: en tupel af (title, None) hvis titlen er gyldig, og ellers
+              (None, fejlkode) hvor fejlkoden er en af ``title-type``,
+              ``root-type``, ``period-type`` og ``period``.
+
+    :example:
+
+    >>> tk.try_validate(('KASS', 2011))
+    (('KASS', 2011), None)
+    >>> tk.try_validate(('KASS', 11))
+    (None, 'period')
+    """
+    if isinstance(title, _TitleABC):
+        title = title.title_tuple()
+    if type(title) is tuple and len(title) == 2:
+        root, period = title
+    else:
+        try:
+            root, period = title
+        except (TypeError, ValueError):
+            return None, 'title-type'
+    error = _title_error(root, period)
+    if error is not None:
+        return None, error
+    interned = root_registry.intern(root)
+    if interned is not root or type(title) is not tuple:
+        title = (interned, period)
+    return title, None
+
+
+def validate_many(titles):
+    """
+    Valider mange titler på én gang med :func:`try_validate`.
+
+    :param titles: titlerne der skal valideres.
+
+    :returns: en liste med en fejlkode for hver titel, eller None for
+              gyldige titler.
+
+    :example:
+
+    >>> tk.validate_many([('KASS', 2011), (0, 2011), ('FORM', '2011')])
+    [None, 'root-type', 'period-type']
+    """
+    return [try_validate(title)[1] for title in titles]
+
+
+_SPECIAL_EMAILS = {}  # (root, period) -> email
+_SPECIAL_ROOTS = {}  # (email, period) -> root
+_SPECIAL_EMAIL_NAMES = set()  # the emails in _SPECIAL_ROOTS
+_SPECIAL_ROOT_NAMES = set()  # the roots in _SPECIAL_ROOTS
+
+
+def add_special_case(root, period, email):
+    """
+    Tilføj et særtilfælde hvor en titel har et andet emailnavn end normalt.
+
+    Særtilfældet bruges af :func:`email` og af :func:`parse`.
+    Kan raise ValueError hvis titlen eller emailnavnet i forvejen har et
+    andet særtilfælde i samme periode.
+
+    :param str root: roden af titlen.
+    :param int period: perioden af titlen.
+    :param str email: emailnavnet uden prefix og postfix.
+
+    :example:
+
+    >>> tk.email(("FUÄU", 2021), 2021)
+    'FUAEU21'
+    >>> tk.parse("FUAEU21")
+    ('FUÄU', 2021)
+    """
+    root, period = validate_title((root, period))
+    other = _SPECIAL_EMAILS.get((root, period), email)
+    if other != email:
+        raise ValueError("%s %s already has the email %s" %
+                         (root, period, other))
+    other = _SPECIAL_ROOTS.get((email, period), root)
+    if other != root:
+        raise ValueError("%s %s is already the email of %s" %
+                         (email, period, other))
+    _SPECIAL_EMAILS[root, period] = email
+    _SPECIAL_ROOTS[email, period] = root
+    _SPECIAL_EMAIL_NAMES.add(email)
+    _SPECIAL_ROOT_NAMES.add(root)
+    root_registry.clear_rejected()
+    if _cache is not None:
+        _cache.invalidate()
+
+
+def load_special_cases(path):
+    """
+    Tilføj særtilfælde fra en JSON-fil med :func:`add_special_case`.
+
+    Filen skal indeholde en liste af lister med rod, periode og emailnavn,
+    f.eks. ``[["FUÄU", 2021, "FUAEU"]]``.
+
+    :param str path: filen der skal læses.
+    """
+    import json
+
+    with open(path, encoding='utf-8') as fp:
+        cases = json.load(fp)
+    for root, period, email in cases:
+        add_special_case(root, period, email)
+
+
+for _case in _SPECIAL_CASES:
+    add_special_case(*_case)
+del _case
+
+
+_INDEX_MAGIC = b'TKTITLER-INDEX01'
+_INDEX_HEADER = struct.Struct('<16sI')  # magic, number of records
+_INDEX_OFFSET = struct.Struct('<I')  # file offset of a record
+_INDEX_RECORD = struct.Struct('<HHH')  # key length, root length, period
+
+_INDEX_TYPES = {
+    'prefix': [
+        lambda t, g, x=x: prefix(t, g, type=x)
+        for x in (_PREFIXTYPE_NORMAL, _PREFIXTYPE_UNICODE, _PREFIXTYPE_TEX)],
+    'postfix': [
+        lambda t, g, x=x: postfix(t, type=x)
+        for x in (_POSTFIXTYPE_SINGLE, _POSTFIXTYPE_DOUBLE,
+                  _POSTFIXTYPE_SLASH, _POSTFIXTYPE_LONGSLASH)],
+    'prepostfix': [
+        lambda t, g, x=x, y=y: prepostfix(t, g, prefixtype=x, postfixtype=y)
+        for x in (_PREFIXTYPE_NORMAL, _PREFIXTYPE_UNICODE, _PREFIXTYPE_TEX)
+        for y in (_POSTFIXTYPE_SINGLE, _POSTFIXTYPE_DOUBLE,
+                  _POSTFIXTYPE_SLASH, _POSTFIXTYPE_LONGSLASH)],
+    'email': [
+        lambda t, g, x=x: email(t, g, type=x)
+        for x in (_EMAILTYPE_POSTFIX, _EMAILTYPE_PREFIX)],
+}
+
+
+def build_index(path, roots, years, types=None, gfyear=None):
+    """
+    Skriv en sorteret opslagsfil over alle aliaser for de givne titler.
+
+    Filen kan åbnes med :func:`open_index` og deles mellem processer,
+    da den læses via mmap uden at blive deserialiseret.
+
+    :param str path: filen der skal skrives.
+    :param roots: rødderne der skal med i filen.
+    :param years: perioderne der skal med i filen.
+    :param types: navnene på de funktioner hvis output skal med i filen.
+                  En delmængde af ``prefix``, ``postfix``, ``prepostfix`` og
+                  ``email``. Som standard bruges alle.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+
+    :example:
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'aliases.idx')
+    >>> tk.build_index(path, ['FORM', 'KASS'], range(2010, 2017), gfyear=2016)
+    >>> with tk.open_index(path) as index:
+    ...     index['T2OKA$$']
+    ('KASS', 2011)
+    """
+    gfyear = get_gfyear(gfyear)
+    if types is None:
+        types = sorted(_INDEX_TYPES)
+    renderers = []
+    for t in types:
+        try:
+            renderers.extend(_INDEX_TYPES[t])
+        except KeyError:
+            raise ValueError("\'%s\' is not a valid type-parameter" % t)
+
+    entries = {}
+    for root in roots:
+        for period in years:
+            title = validate_title((root, period))
+            for render in renderers:
+                key = _normalize(render(title, gfyear)).encode('utf-8')
+                prev = entries.setdefault(key, title)
+                if prev != title:
+                    raise ValueError("%s is an alias of both %s and %s" %
+                                     (key.decode('utf-8'), prev, title))
+
+    offsets = []
+    records = []
+    pos = _INDEX_HEADER.size + _INDEX_OFFSET.size * len(entries)
+    for key in sorted(entries):
+        root, period = entries[key]
+        root = root.encode('utf-8')
+        record = (_INDEX_RECORD.pack(len(key), len(root), period) +
+                  key + root)
+        offsets.append(_INDEX_OFFSET.pack(pos))
+        records.append(record)
+        pos += len(record)
+
+    with open(path, 'wb') as fp:
+        fp.write(_INDEX_HEADER.pack(_INDEX_MAGIC, len(entries)))
+        fp.writelines(offsets)
+        fp.writelines(records)
+
+
+class _AliasIndex(object):
+    def __init__(self, path):
+        import mmap
+
+        with open(path, 'rb') as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != _INDEX_MAGIC:
+            self._mm.close()
+            raise ValueError("%s is not a title index" % path)
+
+    def _record(self, i):
+        pos, = _INDEX_OFFSET.unpack_from(
+            self._mm, _INDEX_HEADER.size + _INDEX_OFFSET.size * i)
+        key_len, root_len, period = _INDEX_RECORD.unpack_from(self._mm, pos)
+        pos += _INDEX_RECORD.size
+        return pos, key_len, root_len, period
+
+    def get(self, alias, default=None):
+        key = _normalize(alias).encode('utf-8')
+        mm = self._mm
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos, key_len, root_len, period = self._record(mid)
+            k = mm[pos:pos + key_len]
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                pos += key_len
+                root = mm[pos:pos + root_len].decode('utf-8')
+                return root_registry.intern(root), period
+        return default
+
+    def __getitem__(self, alias):
+        title = self.get(alias)
+        if title is None:
+            raise KeyError(alias)
+        return title
+
+    def __contains__(self, alias):
+        return self.get(alias) is not None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def open_index(path):
+    """
+    Åbn en opslagsfil skrevet af :func:`build_index`.
+
+    Det returnerede objekt slår aliaser op ved binær søgning direkte i filen.
+    ``index[alias]`` giver en tupel af (root, period) og ``index.get(alias)``
+    giver None for ukendte aliaser. Aliaset normaliseres som i :func:`parse`.
+
+    :param str path: filen der skal åbnes.
+    """
+    return _AliasIndex(path)
+
+
 def _funny_substitute(root):
     replace_dict = {'KASS': 'KA$$'}
     root = _multireplace(root, replace_dict)
@@ -748,3 +2586,1067 @@ def _multireplace(string, replacements):
 
     # For each match, look up the new string in the replacements
     return regexp.sub(lambda match: replacements[match.group(0)], string)
+
+
+class _Pipeline(object):
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def _then(self, fn):
+        return _Pipeline(fn(chunk) for chunk in self._chunks)
+
+    def map(self, fn):
+        return self._then(lambda chunk: [fn(x) for x in chunk])
+
+    def normalize(self):
+        return self._then(lambda chunk: [_normalize(x) for x in chunk])
+
+    def parse(self, gfyear=None, errors='raise', cache_size=65536):
+        if errors not in ('raise', 'skip'):
+            raise ValueError("\'%s\' is not a valid errors-parameter" %
+                             errors)
+        parse_cached = functools.lru_cache(maxsize=cache_size)(parse_relative)
+
+        def stage(chunk):
+            g, error = _check_gfyear(gfyear)
+            if error is not None:
+                g = gfyear
+            result = []
+            for alias in chunk:
+                try:
+                    relative = parse_cached(alias)
+                except ValueError:
+                    if errors == 'raise':
+                        raise
+                    continue
+                if error is not None and relative.postfix_year is None:
+                    # Raise the error about gfyear instead of skipping the
+                    # alias.
+                    get_gfyear(gfyear)
+                try:
+                    result.append(relative.resolve(g))
+                except ValueError:
+                    if errors == 'raise':
+                        raise
+            return result
+
+        return self._then(stage)
+
+    def filter(self, predicate=None, known_only=False):
+        def stage(chunk):
+            if known_only:
+                chunk = [t for t in chunk if _is_known_root(t[0])]
+            if predicate is not None:
+                chunk = [x for x in chunk if predicate(x)]
+            return chunk
+
+        return self._then(stage)
+
+    def render(self, *formats, gfyear=None):
+        if not formats:
+            raise TypeError("render() needs at least one format")
+
+        def stage(chunk):
+            g = get_gfyear(gfyear)
+            if len(formats) == 1:
+                return [render(t, g, formats)[formats[0]] for t in chunk]
+            return [render(t, g, formats) for t in chunk]
+
+        return self._then(stage)
+
+    def batch(self, size):
+        def batches():
+            buf = []
+            for chunk in self._chunks:
+                buf.extend(chunk)
+                while len(buf) >= size:
+                    yield buf[:size]
+                    del buf[:size]
+            if buf:
+                yield buf
+
+        return batches()
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+
+def pipeline(source, chunk_size=1000):
+    """
+    Lav en doven pipeline over aliaser eller titler.
+
+    Elementerne fra ``source`` behandles ``chunk_size`` ad gangen, så kun
+    en enkelt chunk ligger i hukommelsen pr. trin. Pipelinen bygges med
+    følgende metoder, der hver returnerer en ny pipeline:
+
+    ``normalize()``
+        Normaliser aliaser som :func:`parse` gør.
+    ``parse(gfyear=None, errors='raise', cache_size=65536)``
+        Parse aliaser til titler med :func:`parse_relative` gennem en
+        LRU-cache. Med ``errors='skip'`` springes aliaser der ikke kan
+        parses over.
+    ``filter(predicate=None, known_only=False)``
+        Behold elementer hvor ``predicate`` er sand. Med ``known_only=True``
+        beholdes kun titler med en kendt rod (se :func:`known_roots`).
+    ``render(*formats, gfyear=None)``
+        Skriv titler med :func:`render`. Med ét format gives en str pr.
+        titel, og ellers en dict.
+    ``map(fn)``
+        Kald ``fn`` på hvert element.
+
+    Resultatet fås ved at iterere over pipelinen, eller med ``batch(size)``,
+    der returnerer en iterator af lister med ``size`` elementer.
+
+    :param source: en iterable af aliaser eller titler.
+    :param int chunk_size: antal elementer der behandles ad gangen.
+
+    :example:
+
+    >>> p = tk.pipeline(['gform', 'john.doe', 'KA$$ 12', 'T2OABEN'])
+    >>> p = p.parse(2016, errors='skip').filter(known_only=True)
+    >>> list(p.render('email:prefix', gfyear=2016))
+    ['GFORM', 'TOKASS']
+    >>> list(tk.pipeline(range(2010, 2015)).map(lambda y: ('CERM', y))
+    ...      .render('postfix', gfyear=2016).batch(2))
+    [['CERM10', 'CERM11'], ['CERM12', 'CERM13'], ['CERM14']]
+    """
+    def chunks():
+        it = iter(source)
+        while True:
+            chunk = list(itertools.islice(it, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    return _Pipeline(chunks())
+
+
+class _StreamSummary(object):
+    # Space-saving counter with at most k items. Items are kept in buckets
+    # of equal count, so that both incrementing an item and replacing the
+    # least counted item take constant time.
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self._buckets = {}
+        self._min = 0
+
+    def _move(self, item, old, new):
+        if old:
+            bucket = self._buckets[old]
+            bucket.discard(item)
+            if not bucket:
+                del self._buckets[old]
+                if old == self._min:
+                    self._min = new
+        self._buckets.setdefault(new, set()).add(item)
+        self.counts[item] = new
+
+    def add(self, item):
+        count = self.counts.get(item)
+        if count is not None:
+            self._move(item, count, count + 1)
+        elif len(self.counts) < self.k:
+            self._move(item, 0, 1)
+            self._min = 1
+        else:
+            # The new item replaces the least counted one and inherits its
+            # count.
+            least = self._min
+            evicted = self._buckets[least].pop()
+            del self.counts[evicted]
+            self.counts[item] = least
+            self._buckets[least].add(item)
+            self._move(item, least, least + 1)
+
+
+def count_titles(stream, gfyear=None, top_k=None, known_only=False,
+                 cache_size=65536):
+    """
+    Tæl hvor mange gange hver titel forekommer i en strøm af aliaser.
+
+    Aliaserne parses med :func:`parse_relative` gennem en LRU-cache, så
+    gentagne aliaser kun parses én gang. Aliaser der ikke kan parses
+    springes over.
+
+    Med ``top_k`` tælles kun de ``top_k`` hyppigste titler med
+    space-saving-algoritmen, så hukommelsesforbruget er begrænset uanset
+    hvor mange forskellige titler strømmen indeholder. Tallene er da en
+    øvre grænse, der højst er for stor med antallet af aliaser divideret
+    med ``top_k``. En titel der forekommer oftere end det, er altid med.
+
+    :param stream: en iterable af aliaser.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+    :param int top_k: antal titler der tælles, eller None for alle.
+    :param bool known_only: tæl kun titler med en kendt rod
+                            (se :func:`known_roots`).
+    :param int cache_size: antal aliaser der gemmes parse-resultater for.
+
+    :rtype: collections.Counter
+
+    :example:
+
+    >>> c = tk.count_titles(['GFORM', 'FORM15', 'gform', 'KA$$ 15/16',
+    ...                      'FUAAA11'], 2016)
+    >>> c.most_common()
+    [(('FORM', 2015), 3), (('KASS', 2015), 1)]
+    >>> tk.count_titles(['GFORM', 'CERM', 'GFORM', 'KASS', 'GFORM'], 2016,
+    ...                 top_k=1)
+    Counter({('FORM', 2015): 5})
+    """
+    import collections
+
+    if top_k is not None and top_k < 1:
+        raise ValueError("\'%s\' is not a valid top_k" % top_k)
+    g, error = _check_gfyear(gfyear)
+    if error is not None:
+        g = gfyear
+
+    @functools.lru_cache(maxsize=cache_size)
+    def parse_cached(alias):
+        # Returns None for aliases that are skipped, so that failures are
+        # cached as well.
+        try:
+            relative = parse_relative(alias)
+        except ValueError:
+            return None
+        if error is not None and relative.postfix_year is None:
+            # Raise the error about gfyear instead of skipping the alias.
+            get_gfyear(gfyear)
+        try:
+            title = relative.resolve(g)
+        except ValueError:
+            return None
+        if known_only and not _is_known_root(title[0]):
+            return None
+        return title
+
+    if top_k is None:
+        counts = collections.Counter()
+        for alias in stream:
+            title = parse_cached(alias)
+            if title is not None:
+                counts[title] += 1
+        return counts
+    summary = _StreamSummary(top_k)
+    for alias in stream:
+        title = parse_cached(alias)
+        if title is not None:
+            summary.add(title)
+    return collections.Counter(summary.counts)
+
+
+_BASELINE_KNOWN_ROOTS = ('CERM', 'FORM', 'INKA', 'KASS', 'NF', 'PR', 'SEKR',
+                         'VC')
+
+
+class _Reference(object):
+    """Reference implementations of parse and the output functions.
+
+    These are the straightforward implementations without caches, lookup
+    tables or precompiled patterns. They are slow, but simple enough to
+    serve as the definition of what the faster functions must return.
+    Only the built-in output types are supported, and no warnings are
+    logged.
+    """
+
+    prefix_types = (_PREFIXTYPE_NORMAL, _PREFIXTYPE_UNICODE, _PREFIXTYPE_TEX)
+    postfix_types = (_POSTFIXTYPE_SINGLE, _POSTFIXTYPE_DOUBLE,
+                     _POSTFIXTYPE_SLASH, _POSTFIXTYPE_LONGSLASH)
+    email_types = (_EMAILTYPE_POSTFIX, _EMAILTYPE_PREFIX)
+
+    def normalize(self, input_alias):
+        s = input_alias.upper()
+        s = s.replace(' ', '')
+
+        replace_dict = {'BEST/FU': 'BESTFU'}
+        s = _multireplace(s, replace_dict)
+
+        table = {'$': 'S',
+                 '\N{POUND SIGN}': 'S',
+                 '\N{DOUBLE-STRUCK CAPITAL C}': 'C'}
+
+        def tr(c):
+            try:
+                return table[c]
+            except KeyError:
+                try:
+                    return str(unicodedata.digit(c))
+                except ValueError:
+                    return c
+
+        letters = ''.join(DIGRAPHS.keys())
+        return re.sub(r'[^0-9A-Z%s]' % letters,
+                      lambda mo: tr(mo.group(0)), s)
+
+    def _normalize_escaped(self, alias):
+        if ("AAA" in alias and "AAAA" not in alias) or "AAE" in alias:
+            raise ValueError(
+                "%s is an ambiguous alias. Cannot normalize." % alias)
+        replace_dict = {
+            digraph: character for character, digraph in DIGRAPHS.items()}
+        return _multireplace(alias, replace_dict)
+
+    def _parse_prefix(self, prefix):
+        pattern = r"^(([KGBO]|T[0-9T]*O)[0-9]*)*$"
+        if not re.match(pattern, prefix):
+            raise ValueError(prefix)
+        prefix_value = dict(K=-1, G=1, B=2, O=3, T=1)
+        factors = []
+        for base, exponent in re.findall(r"([KGBOT])([0-9]*)", prefix):
+            if len(exponent) > _MAX_EXPONENT_DIGITS:
+                raise ValueError(prefix)
+            factors.append(int(exponent or 1) * prefix_value[base])
+        return sum(factors)
+
+    def _parse_postfix(self, postfix):
+        if not isinstance(postfix, str):
+            raise TypeError(type(postfix))
+        if not postfix:
+            return
+
+        if '/' in postfix:
+            try:
+                first, second = postfix.split('/')
+            except ValueError:
+                raise ValueError(postfix) from None
+            lens = (len(first), len(second))
+            first, second = int(first), int(second)
+            if lens == (2, 2) and (first + 1) % 100 == second:
+                return 2000 + first if first < 56 else 1900 + first
+            elif lens == (4, 4) and first + 1 == second:
+                return first
+            elif lens == (4, 2) and (first + 1) % 100 == second:
+                return first
+        elif len(postfix) == 2:
+            v = int(postfix)
+            return 2000 + v if v < 56 else 1900 + v
+        elif len(postfix) == 4:
+            first, second = int(postfix[0:2]), int(postfix[2:4])
+            if postfix == '2021':
+                return 2020
+            if (first + 1) % 100 == second:
+                return 2000 + first if first < 56 else 1900 + first
+            elif first in (19, 20):
+                return int(postfix)
+        raise ValueError(postfix)
+
+    def _parse_relative(self, input_alias):
+        alias = self.normalize(input_alias)
+        prefix = r"(?P<pre>((([KGBO]|T[0-9T]*O)[0-9]*)*))"
+        postfix = r"(?P<post>([0-9/])*)"
+        letter = '[A-Z%s]' % ''.join(DIGRAPHS.keys())
+        digraphs = '(?:%s)' % '|'.join(DIGRAPHS.values())
+        known_escaped = ('E?FU(%(l)s{2}|%(l)s[A-Z]|[A-Z]%(l)s)' %
+                         dict(l=digraphs))
+        added = sorted(set(_KNOWN_ROOTS) - set(_BASELINE_KNOWN_ROOTS) -
+                       {'BEST', 'FU', 'BESTFU'})
+        known = '|'.join(_BASELINE_KNOWN_ROOTS +
+                         ('E?FU(?:%s){2}' % letter, 'BEST', 'FU', 'BESTFU') +
+                         tuple(added))
+        known_escaped_pattern = '^%s(?P<root>%s)%s$' % (prefix, known_escaped,
+                                                        postfix)
+        known_pattern = '^%s(?P<root>%s)%s$' % (prefix, known, postfix)
+        any_pattern = r'^%s(?P<root>[\s\S]*?)%s$' % (prefix, postfix)
+
+        mo = re.match(known_escaped_pattern, alias)
+        if mo is not None:
+            needs_unescape = True
+        else:
+            mo = re.match(known_pattern, alias) or re.match(any_pattern, alias)
+            needs_unescape = False
+        pre, root, post = mo.group('pre', 'root', 'post')
+
+        age = self._parse_prefix(pre)
+        gfyear = self._parse_postfix(post)
+        return age, root, gfyear, needs_unescape
+
+    def parse(self, alias, gfyear=None):
+        age, root, postfix, needs_unescape = self._parse_relative(alias)
+        gfyear = postfix or get_gfyear(gfyear)
+        period = gfyear - age
+        if needs_unescape:
+            try:
+                root = _SPECIAL_ROOTS[root, period]
+            except KeyError:
+                root = self._normalize_escaped(root)
+        return root, period
+
+    def prefix(self, title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
+        (root, period), gfyear = _validate(title, gfyear)
+
+        root = _funny_substitute(root)
+        age = gfyear - period
+
+        if type == _PREFIXTYPE_TEX:
+            root = _escape_tex(root)
+
+        def identity(n):
+            return n
+
+        def unicode_superscript(n):
+            digits = '⁰¹²³⁴⁵⁶⁷⁸⁹'
+            return ''.join(digits[int(i)] for i in str(n))
+
+        def tex_superscript(n):
+            return '$^{%s}$' % (n,)
+
+        if type == _PREFIXTYPE_NORMAL:
+            sup_fn = identity
+        elif type == _PREFIXTYPE_UNICODE:
+            sup_fn = unicode_superscript
+        elif type == _PREFIXTYPE_TEX:
+            sup_fn = tex_superscript
+        else:
+            raise ValueError("\'%s\' is not a valid type-parameter" % type)
+
+        prefixes = ['K', '', 'G', 'B', 'O', 'TO']
+        if age < -1:
+            return 'K%s' % sup_fn(-age) + root
+        elif age + 1 < len(prefixes):
+            return prefixes[age + 1] + root
+        else:
+            return 'T%sO' % sup_fn(age - 3) + root
+
+    def kprefix(self, title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
+        (root, period), gfyear = _validate(title, gfyear)
+
+        if gfyear < period:
+            return self.prefix((root, period), gfyear, type=type)
+        return "K" + self.prefix((root, period - 1), gfyear, type=type)
+
+    def postfix(self, title, *, type=_POSTFIXTYPE_SINGLE):
+        root, period = validate_title(title)
+        root = _funny_substitute(root)
+
+        space = " "
+        if root == "":
+            space = ""
+
+        if type == _POSTFIXTYPE_SINGLE:
+            postfix = str(period)[2:4]
+        elif type == _POSTFIXTYPE_DOUBLE:
+            postfix = str(period)[2:4] + str(period+1)[2:4]
+        elif type == _POSTFIXTYPE_SLASH:
+            postfix = space + str(period)[2:4] + "/" + str(period+1)[2:4]
+        elif type == _POSTFIXTYPE_LONGSLASH:
+            postfix = space + str(period) + "/" + str(period+1)[2:4]
+        else:
+            raise ValueError("\'%s\' is not a valid type-parameter" % type)
+        return root + postfix
+
+    def prepostfix(self, title, gfyear=None, *, prefixtype=_PREFIXTYPE_NORMAL,
+                   postfixtype=_POSTFIXTYPE_LONGSLASH):
+        root, period = validate_title(title)
+        pre_and_name = self.prefix(title, gfyear, type=prefixtype)
+        if root == "EFUIT" or period < 1959:
+            return pre_and_name
+        post = self.postfix(("", period), type=postfixtype)
+        return '%s %s' % (pre_and_name, post)
+
+    def email(self, title, gfyear=None, *, type=_EMAILTYPE_POSTFIX):
+        (root, period), gfyear = _validate(title, gfyear)
+
+        root = self.normalize(root)
+        try:
+            root = _SPECIAL_EMAILS[root, period]
+        except KeyError:
+            root = _multireplace(root, DIGRAPHS)
+            digraphs_lower = {ch.lower(): di.lower()
+                              for ch, di in DIGRAPHS.items()}
+            root = _multireplace(root, digraphs_lower)
+
+        pre = ""
+        post = ""
+        if type == _EMAILTYPE_POSTFIX:
+            post = str(period)[2:4]
+        elif type == _EMAILTYPE_PREFIX:
+            pre = self.prefix(("", period), gfyear, type=_PREFIXTYPE_NORMAL)
+        else:
+            raise ValueError("\'%s\' is not a valid type-parameter" % type)
+        return pre + root + post
+
+
+reference = _Reference()
+"""Referenceimplementationer af :func:`parse`, :func:`prefix`, :func:`kprefix`,
+:func:`postfix`, :func:`prepostfix` og :func:`email`.
+
+De er langsomme, men enkle, og definerer hvad de hurtige funktioner skal
+returnere, f.eks. ``tk.reference.parse('GFORM', 2016)``.
+Se :func:`enable_parity_check`.
+"""
+
+_PARITY_FUNCTIONS = ('parse', 'prefix', 'kprefix', 'postfix', 'prepostfix',
+                     'email')
+_parity = None
+
+
+def _parity_wrapper(name, fn):
+    ref = getattr(reference, name)
+    rate, callback, rng = _parity
+    types = dict(type=(_Reference.postfix_types if name == 'postfix' else
+                       _Reference.email_types if name == 'email' else
+                       _Reference.prefix_types),
+                 prefixtype=_Reference.prefix_types,
+                 postfixtype=_Reference.postfix_types)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if rng.random() >= rate or not all(
+                v in types[k] for k, v in kwargs.items() if k in types):
+            return fn(*args, **kwargs)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            result = e
+        try:
+            expected = ref(*args, **kwargs)
+        except Exception as e:
+            expected = e
+        if isinstance(result, Exception) or isinstance(expected, Exception):
+            same = type(result) is type(expected)
+        else:
+            same = result == expected
+        if not same:
+            callback(name, args, kwargs, result, expected)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return wrapper
+
+
+def _report_mismatch(name, args, kwargs, result, expected):
+    _warning('%s(%s) returned %r, but the reference returned %r' % (
+        name, ', '.join([repr(a) for a in args] +
+                        ['%s=%r' % kv for kv in sorted(kwargs.items())]),
+        result, expected))
+
+
+def enable_parity_check(rate=0.01, callback=None, seed=None):
+    """
+    Sammenlign en andel af kaldene med :data:`reference`.
+
+    Når den er slået til, kaldes den tilsvarende funktion i
+    :data:`reference` også for en tilfældig andel ``rate`` af kaldene til
+    :func:`parse`, :func:`prefix`, :func:`kprefix`, :func:`postfix`,
+    :func:`prepostfix` og :func:`email`. Hvis resultaterne er forskellige,
+    eller kun den ene raiser en exception, kaldes
+    ``callback(name, args, kwargs, result, expected)``. Som standard logges
+    forskellen som en advarsel. Kaldet returnerer altid det normale
+    resultat. Kald med egne typer (se :func:`register_prefix_type`)
+    sammenlignes ikke.
+
+    Kontrollen omfatter kun kald gennem modulet, f.eks. ``tk.parse``, og
+    ikke funktioner der er importeret med ``from tktitler import parse``.
+
+    :param float rate: andelen af kald der sammenlignes, mellem 0 og 1.
+    :param callback: funktion der kaldes ved forskelle.
+    :param seed: seed til :class:`random.Random`.
+
+    :example:
+
+    >>> mismatches = []
+    >>> tk.enable_parity_check(1, lambda *args: mismatches.append(args))
+    >>> tk.parse('T2OKA$$', 2016), mismatches
+    (('KASS', 2011), [])
+    >>> tk.disable_parity_check()
+    """
+    global _parity
+    import random
+
+    if not 0 <= rate <= 1:
+        raise ValueError("\'%s\' is not a valid rate" % rate)
+    if callback is None:
+        callback = _report_mismatch
+    _parity = (rate, callback, random.Random(seed))
+    _install_wrappers()
+
+
+def disable_parity_check():
+    """
+    Slå kontrollen fra :func:`enable_parity_check` fra igen.
+    """
+    global _parity
+    _parity = None
+    _install_wrappers()
+
+
+class _Call(object):
+    __slots__ = ('name', 'args', 'kwargs', 'gfyear', 'duration', 'branch',
+                 'result', 'exception')
+
+    def __init__(self, name, args, kwargs, gfyear):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.gfyear = gfyear
+        self.duration = None
+        self.branch = None
+        self.result = None
+        self.exception = None
+
+    def __repr__(self):
+        return '<Call %s>' % ' '.join(
+            '%s=%r' % (k, getattr(self, k)) for k in self.__slots__)
+
+
+class _Hook(object):
+    __slots__ = ('on_start', 'on_end', 'sample_rate', 'rng')
+
+    def __init__(self, on_start, on_end, sample_rate, rng):
+        self.on_start = on_start
+        self.on_end = on_end
+        self.sample_rate = sample_rate
+        self.rng = rng
+
+
+_HOOK_FUNCTIONS = ('parse', 'prefix', 'postfix', 'prepostfix', 'email',
+                   'validate_title')
+_hooks = ()
+
+
+def _parse_branch(alias):
+    try:
+        mo_alias, mo, needs_unescape = _match_alias(alias)
+    except Exception:
+        return None
+    if needs_unescape:
+        return 'escaped'
+    known_escaped_re, known_re, any_re = _get_alias_patterns()
+    return 'known' if known_re.match(mo_alias) else 'unknown'
+
+
+def _hook_wrapper(name, fn, hooks):
+    import time
+
+    perf_counter = time.perf_counter
+    takes_gfyear = name not in ('postfix', 'validate_title')
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        sampled = [h for h in hooks
+                   if h.sample_rate >= 1 or h.rng.random() < h.sample_rate]
+        if not sampled:
+            return fn(*args, **kwargs)
+        gfyear = None
+        if takes_gfyear:
+            gfyear, error = _check_gfyear(
+                kwargs.get('gfyear', args[1] if len(args) > 1 else None))
+            if error is not None:
+                gfyear = None
+        call = _Call(name, args, kwargs, gfyear)
+        for hook in sampled:
+            if hook.on_start is not None:
+                hook.on_start(call)
+        start = perf_counter()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            call.duration = perf_counter() - start
+            if name == 'parse' and args:
+                call.branch = _parse_branch(args[0])
+            for hook in sampled:
+                if hook.on_end is not None:
+                    hook.on_end(call)
+
+    return wrapper
+
+
+def add_hook(on_start=None, on_end=None, sample_rate=1.0, seed=None):
+    """
+    Tilføj en hook der kaldes omkring kald til :func:`parse`,
+    :func:`prefix`, :func:`postfix`, :func:`prepostfix`, :func:`email` og
+    :func:`validate_title`.
+
+    For en tilfældig andel ``sample_rate`` af kaldene kaldes
+    ``on_start(call)`` før og ``on_end(call)`` efter funktionen. ``call`` er
+    det samme objekt i begge kald og har følgende attributter:
+
+    ``name``, ``args``, ``kwargs``
+        Funktionens navn og argumenter.
+    ``gfyear``
+        Den gfyear der gælder for kaldet, eller None hvis den ikke er sat
+        eller funktionen ikke bruger gfyear.
+    ``duration``
+        Kaldets varighed i sekunder. Sættes før ``on_end``.
+    ``branch``
+        For :func:`parse` hvordan roden blev genkendt: ``escaped`` for en
+        kendt rod skrevet med ASCII-forlængelser, ``known`` for en kendt
+        rod og ``unknown`` for andre rødder.
+    ``result``, ``exception``
+        Resultatet eller den exception funktionen raisede.
+
+    Kald mellem funktionerne, f.eks. fra :func:`prefix` til
+    :func:`validate_title`, giver også hooks. Ligesom
+    :func:`enable_parity_check` omfatter hooks kun kald gennem modulet.
+    Uden hooks kaldes funktionerne direkte uden ekstra omkostninger.
+
+    :param on_start: funktion der kaldes før kaldet, eller None.
+    :param on_end: funktion der kaldes efter kaldet, eller None.
+    :param float sample_rate: andelen af kald der giver hooks.
+    :param seed: seed til :class:`random.Random`.
+
+    :returns: et objekt der kan gives til :func:`remove_hook`.
+
+    :example:
+
+    >>> calls = []
+    >>> hook = tk.add_hook(on_end=calls.append)
+    >>> tk.parse('GFUOEP', 2016)
+    ('FUØP', 2015)
+    >>> calls[0].name, calls[0].gfyear, calls[0].branch, calls[0].result
+    ('parse', 2016, 'escaped', ('FUØP', 2015))
+    >>> tk.remove_hook(hook)
+    """
+    global _hooks
+    import random
+
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("\'%s\' is not a valid sample_rate" % sample_rate)
+    hook = _Hook(on_start, on_end, sample_rate, random.Random(seed))
+    _hooks += (hook,)
+    _install_wrappers()
+    return hook
+
+
+def remove_hook(hook):
+    """
+    Fjern en hook tilføjet med :func:`add_hook`.
+
+    :raises ValueError: hvis hooken ikke er tilføjet.
+    """
+    global _hooks
+    if hook not in _hooks:
+        raise ValueError("%r is not an installed hook" % (hook,))
+    _hooks = tuple(h for h in _hooks if h is not hook)
+    _install_wrappers()
+
+
+def _install_wrappers():
+    g = globals()
+    for name in _ORIGINALS:
+        fn = _ORIGINALS[name]
+        if _parity is not None and name in _PARITY_FUNCTIONS:
+            fn = _parity_wrapper(name, fn)
+        if _hooks and name in _HOOK_FUNCTIONS:
+            fn = _hook_wrapper(name, fn, _hooks)
+        g[name] = fn
+
+
+def register_sqlite_functions(conn, gfyear=None, cache_size=65536):
+    """
+    Gør titelfunktionerne tilgængelige i SQL på en SQLite-forbindelse.
+
+    Følgende funktioner bliver registreret:
+
+    ``tk_prefix(root, period[, type])``
+        Som :func:`prefix`.
+    ``tk_postfix(root, period[, type])``
+        Som :func:`postfix`.
+    ``tk_email(root, period[, type])``
+        Som :func:`email`.
+    ``tk_parse_root(alias)`` og ``tk_parse_period(alias)``
+        Roden og perioden fra :func:`parse`.
+
+    Funktionerne returnerer NULL hvis et argument er NULL eller ugyldigt.
+    Resultaterne caches, og gfyear fastlægges når funktionerne registreres,
+    så funktionerne er deterministiske.
+
+    :param conn: en :class:`sqlite3.Connection`.
+    :param int gfyear: året hvor nuværende BEST er blevet valgt. Det kan også
+                       sættes som en context. Se :doc:`gfyear`.
+    :param int cache_size: antal resultater der caches for hver funktion.
+
+    :example:
+
+    >>> import sqlite3
+    >>> conn = sqlite3.connect(':memory:')
+    >>> tk.register_sqlite_functions(conn, 2016)
+    >>> conn.execute("SELECT tk_prefix('KASS', 2011), "
+    ...              "tk_email('FUHØ', 2010, 'prefix')").fetchone()
+    ('T2OKA$$', 'T3OFUHOE')
+    >>> conn.execute("SELECT tk_parse_root('GFUOEP'), "
+    ...              "tk_parse_period('GFUOEP')").fetchone()
+    ('FUØP', 2015)
+    """
+    r, error = _check_gfyear(gfyear)
+    if error is None:
+        gfyear = r
+    elif gfyear is None:
+        # Raise "No context gfyear set" when gfyear is needed, even if a
+        # context gfyear is set later.
+        gfyear = _GFYEAR_UNSET
+    cache = functools.lru_cache(maxsize=cache_size)
+
+    def null_on_error(fn):
+        def wrapped(*args):
+            if None in args:
+                return None
+            try:
+                return fn(*args)
+            except (TypeError, ValueError):
+                return None
+
+        return wrapped
+
+    @cache
+    def parse_cached(alias):
+        return try_parse(alias, gfyear)[0] or (None, None)
+
+    functions = [
+        ('tk_prefix', 2, lambda r, p: prefix((r, p), gfyear)),
+        ('tk_prefix', 3, lambda r, p, t: prefix((r, p), gfyear, type=t)),
+        ('tk_postfix', 2, lambda r, p: postfix((r, p))),
+        ('tk_postfix', 3, lambda r, p, t: postfix((r, p), type=t)),
+        ('tk_email', 2, lambda r, p: email((r, p), gfyear)),
+        ('tk_email', 3, lambda r, p, t: email((r, p), gfyear, type=t)),
+        ('tk_parse_root', 1, lambda a: parse_cached(a)[0]),
+        ('tk_parse_period', 1, lambda a: parse_cached(a)[1]),
+    ]
+    for name, narg, fn in functions:
+        fn = null_on_error(cache(fn))
+        try:
+            conn.create_function(name, narg, fn, deterministic=True)
+        except TypeError:
+            # Python < 3.8 has no deterministic argument.
+            conn.create_function(name, narg, fn)
+
+
+def _handle_request(request, gfyear, parse_cached):
+    if not isinstance(request, dict):
+        return {'error': 'request'}
+    response = {}
+    if 'id' in request:
+        response['id'] = request['id']
+    op = request.get('op')
+    gfyear = request.get('gfyear', gfyear)
+    if op == 'parse':
+        alias = request.get('alias')
+        if isinstance(alias, str) and isinstance(gfyear, (int, type(None))):
+            title, error = parse_cached(alias, gfyear)
+        else:
+            title, error = try_parse(alias, gfyear)
+        if error is None:
+            response['result'] = list(title)
+        else:
+            response['error'] = error
+    elif op in ('email', 'prefix'):
+        fn = email if op == 'email' else prefix
+        kwargs = {'type': request['type']} if 'type' in request else {}
+        title = request.get('title')
+        try:
+            response['result'] = fn(tuple(title), gfyear, **kwargs)
+        except (TypeError, ValueError) as e:
+            response['error'] = str(e)
+    else:
+        response['error'] = 'op'
+    return response
+
+
+_SERVER_LIMIT = 2 ** 24
+
+
+async def _read_line(reader):
+    # Like reader.readline(), but a line longer than the stream limit is
+    # skipped and None is returned, so the connection stays usable.
+    import asyncio
+
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b'\n')
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+async def _handle_connection(reader, writer, gfyear, parse_cached):
+    import json
+
+    try:
+        while True:
+            line = await _read_line(reader)
+            if line is None:
+                response = {'error': 'too-long'}
+            elif not line:
+                break
+            else:
+                response = _handle_line(line, gfyear, parse_cached)
+            writer.write(json.dumps(response, ensure_ascii=False)
+                         .encode('utf-8') + b'\n')
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+def _handle_line(line, gfyear, parse_cached):
+    import json
+
+    try:
+        request = json.loads(line.decode('utf-8'))
+    except (ValueError, RecursionError):
+        # RecursionError is raised for deeply nested arrays and objects.
+        return {'error': 'json'}
+    if isinstance(request, list):
+        return [_handle_request(r, gfyear, parse_cached) for r in request]
+    return _handle_request(request, gfyear, parse_cached)
+
+
+async def _start_server(path, gfyear=None, cache_size=65536,
+                        limit=_SERVER_LIMIT):
+    import asyncio
+
+    parse_cached = functools.lru_cache(maxsize=cache_size)(try_parse)
+    _get_alias_patterns()
+
+    def client_connected(reader, writer):
+        return _handle_connection(reader, writer, gfyear, parse_cached)
+
+    return await asyncio.start_unix_server(client_connected, path=path,
+                                           limit=limit)
+
+
+def serve(path, gfyear=None, cache_size=65536, limit=_SERVER_LIMIT):
+    """
+    Start en server der parser og skriver titler over en Unix-socket.
+
+    Serveren kører indtil processen bliver afbrudt. Den kan også startes med
+    ``python -m tktitler serve --socket PATH``. Brug :func:`connect` til at
+    sende forespørgsler til serveren.
+
+    Hver forespørgsel er et JSON-objekt på én linje, og svaret er et
+    JSON-objekt på én linje. En linje med en JSON-liste af forespørgsler
+    giver en liste af svar. Forespørgsler har formen
+    ``{"op": "parse", "alias": ...}``,
+    ``{"op": "email", "title": [root, period]}`` eller
+    ``{"op": "prefix", "title": [root, period]}``,
+    eventuelt med ``gfyear``, ``type`` og ``id``.
+    Svaret har enten ``result`` eller ``error`` samt ``id`` fra
+    forespørgslen.
+
+    :param str path: stien til Unix-socketten.
+    :param int gfyear: året der bruges i forespørgsler uden gfyear.
+    :param int cache_size: antal parse-resultater der caches.
+    :param int limit: største længde af en linje i bytes. Længere linjer
+                      besvares med ``{"error": "too-long"}``.
+    """
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    try:
+        server = loop.run_until_complete(
+            _start_server(path, gfyear, cache_size, limit))
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+    finally:
+        loop.close()
+
+
+class _Client(object):
+    def __init__(self, path):
+        import socket
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._file = self._sock.makefile('rwb')
+
+    def request(self, request):
+        import json
+
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        return json.loads(self._file.readline().decode('utf-8'))
+
+    def batch(self, requests):
+        return self.request(list(requests))
+
+    def _result(self, request):
+        response = self.request(request)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['result']
+
+    def parse(self, alias, gfyear=None):
+        request = {'op': 'parse', 'alias': alias}
+        if gfyear is not None:
+            request['gfyear'] = gfyear
+        return tuple(self._result(request))
+
+    def email(self, title, gfyear=None, *, type=_EMAILTYPE_POSTFIX):
+        request = {'op': 'email', 'title': list(title), 'type': type}
+        if gfyear is not None:
+            request['gfyear'] = gfyear
+        return self._result(request)
+
+    def prefix(self, title, gfyear=None, *, type=_PREFIXTYPE_NORMAL):
+        request = {'op': 'prefix', 'title': list(title), 'type': type}
+        if gfyear is not None:
+            request['gfyear'] = gfyear
+        return self._result(request)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def connect(path):
+    """
+    Forbind til en server startet med :func:`serve`.
+
+    Det returnerede objekt har metoderne ``parse``, ``email`` og ``prefix``
+    der virker som de tilsvarende funktioner, samt ``request`` og ``batch``
+    der sender henholdsvis én og flere forespørgsler og returnerer svarene.
+
+    :param str path: stien til Unix-socketten.
+    """
+    return _Client(path)
+
+
+def _main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m tktitler')
+    subparsers = parser.add_subparsers(dest='command')
+    serve_parser = subparsers.add_parser('serve')
+    serve_parser.add_argument('--socket', required=True)
+    serve_parser.add_argument('--gfyear', type=int)
+    serve_parser.add_argument('--cache-size', type=int, default=65536)
+    serve_parser.add_argument('--limit', type=int, default=_SERVER_LIMIT)
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        serve(args.socket, args.gfyear, args.cache_size, args.limit)
+    else:
+        parser.print_help()
+
+
+_ORIGINALS = {name: globals()[name]
+              for name in _PARITY_FUNCTIONS + _HOOK_FUNCTIONS}
+
+
+if __name__ == '__main__':
+    tk._main()